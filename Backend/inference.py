@@ -1,71 +1,112 @@
 import sys
 import json
+import hashlib
 import logging
 import warnings
 import os
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 warnings.filterwarnings('ignore')
 logging.getLogger().setLevel(logging.ERROR)
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-try:
-    from ml_pipeline import SoilFusionMLPipeline, predict_yield, detect_anomaly, recommend_planting
-    
-    if len(sys.argv) < 2:
-        print(json.dumps({"error": "Field ID required"}))
-        sys.exit(1)
-        
-    field_id = int(sys.argv[1])
-    lang = sys.argv[2] if len(sys.argv) > 2 else "en"
-    
+
+from ml_cache import ResultCache, directory_signature
+from ml_jobs import TrainingJobs
+from ml_manifest import MANIFEST_FILE, UnknownFieldError, field_entries
+from ml_metrics import instrumented, recorder, summarize
+
+DATA_DIR = 'data'
+WARM_MODELS = ['yield_model', 'anomaly_model', 'clustering_model']
+MODEL_DIR = 'models'
+PLOTS_DIR = 'plots'
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Per-field results shared by the worker and one-shot runs; SOILFUSION_RESULT_CACHE=off disables.
+# Not under MODEL_DIR: every training run publishes a new models directory.
+RESULT_CACHE = os.environ.get('SOILFUSION_RESULT_CACHE', os.path.join('cache', 'result_cache.sqlite'))
+result_cache = None if RESULT_CACHE == 'off' else ResultCache(
+    RESULT_CACHE,
+    max_entries=int(os.environ.get('SOILFUSION_RESULT_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('SOILFUSION_RESULT_CACHE_TTL', 3600))
+)
+
+
+@instrumented()
+def load_pipeline():
+    from ml_pipeline import SoilFusionMLPipeline
+
+    pipeline = SoilFusionMLPipeline(
+        data_dir=DATA_DIR,
+        model_dir=MODEL_DIR,
+        plots_dir=PLOTS_DIR
+    )
+    pipeline.load_features()
+    return pipeline
+
+
+@instrumented()
+def load_field_pipeline(field_id):
+    # One-shot single-field runs read only that field's recent days from the per-field
+    # store; the whole feature store only when that is stale
+    from ml_pipeline import SoilFusionMLPipeline
+
     pipeline = SoilFusionMLPipeline(
-        data_dir='data', 
-        model_dir='models', 
-        plots_dir='plots'
+        data_dir=DATA_DIR,
+        model_dir=MODEL_DIR,
+        plots_dir=PLOTS_DIR
     )
-    pipeline.load_data()
-    pipeline.preprocess_data()
-    
-    df = pipeline.processed_df
-    field_records = df[df['field_id'] == field_id]
+    if not pipeline.load_field(field_id):
+        pipeline.load_features()
+    return pipeline
+
+
+@instrumented(rows=lambda *a, **k: 1)
+def analyze_field(pipeline, field_id, lang="en"):
+    from ml_inference import predict_yield, detect_anomaly, recommend_planting, field_index
+
+    field_records = field_index(pipeline).rows(field_id)
     if field_records.empty:
-        raise ValueError(f"No record found for Field ID {field_id}.")
-    
+        raise UnknownFieldError([field_id])
+
     field_data = field_records.iloc[-1]
     yld = predict_yield(field_id, pipeline)
     is_anom = detect_anomaly(field_id, pipeline)
     rec = recommend_planting(field_id, pipeline)
-    
+
     moisture = field_data['moisture']
     ph = field_data['ph']
     nitrogen = field_data['nitrogen']
-    
+
     # NLP Engine
     if is_anom or rec["Soil_Health_Risk"] == "High":
         recovery_en = "3-4 Weeks (Treatment Required)"
         recovery_hi = "3-4 हफ़्ते (उपचार आवश्यक)"
-        
+
         issue_en = f"Warning: Your field is currently unstable. "
         issue_hi = f"चेतावनी: आपका खेत अभी अस्थिर है। "
-        
+
         if moisture < 20:
             issue_en += "Moisture is dangerously low. "
             issue_hi += "नमी बहुत कम है। "
         elif moisture > 40:
             issue_en += "Moisture is too high (waterlogging risk). "
             issue_hi += "नमी बहुत अधिक है (जलभराव का खतरा)। "
-            
+
         if ph < 6.0 or ph > 7.0:
             issue_en += "The soil pH is unbalanced. "
             issue_hi += "मिट्टी का पीएच असंतुलित है। "
-            
+
         if nitrogen < 50:
             issue_en += "Nitrogen levels are critically low. "
             issue_hi += "नाइट्रोजन का स्तर बहुत कम है। "
-            
+
         action_en = "Precaution: Delay planting. Apply fertilizers and regulate irrigation immediately."
         action_hi = "सावधानी: बुवाई में देरी करें। तुरंत उर्वरक डालें और सिंचाई को नियंत्रित करें।"
-        
+
     elif rec["Soil_Health_Risk"] == "Medium":
         recovery_en = "1-2 Weeks (Minor Adjustments)"
         recovery_hi = "1-2 हफ़्ते (मामूली सुधार)"
@@ -99,7 +140,7 @@ try:
             "nitrogen": round(float(row.get('nitrogen', 0)), 1)
         })
 
-    output = {
+    return {
         "field_id": field_id,
         "yield_prediction_kg_per_ha": float(yld),
         "anomaly_detected": bool(is_anom),
@@ -108,11 +149,281 @@ try:
         "summary": summary_text,
         "historical_data": graph_data
     }
-    
-    print(json.dumps(output))
-    
-except Exception as e:
-    import traceback
-    var = traceback.format_exc()
-    print(json.dumps({"error": str(e), "trace": var}))
-    sys.exit(1)
+
+
+@instrumented(rows=lambda result, *a, **k: len(result["fields"]))
+def score_all_fields(pipeline, field_ids='all'):
+    from ml_inference import score_fields
+
+    scores = score_fields(field_ids, pipeline)
+    return {"fields": json.loads(scores.to_json(orient='records'))}
+
+
+def parse_field_ids(value):
+    # "all", a single id, or a comma-separated list of ids
+    if isinstance(value, list):
+        return [int(v) for v in value]
+    value = str(value).strip()
+    if value == 'all':
+        return 'all'
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def run_timed(call, timings=False):
+    # With timings, adds a "timings" block with the spans recorded during this call only
+    if not timings:
+        return call()
+    with recorder.collect() as spans:
+        with recorder.span('request'):
+            result = call()
+    result["timings"] = summarize(spans)
+    return result
+
+
+def data_signature():
+    # Cheap stat-only fingerprint of the data directory; changes after every upload.
+    # The field manifest is derived from the data, so rewriting it doesn't count.
+    return directory_signature(DATA_DIR, lambda name: name != MANIFEST_FILE)
+
+
+def check_field_id(field_id):
+    # Rejects ids missing from a current field manifest before anything is loaded; without
+    # one, analyze_field finds out from the data
+    entries = field_entries(DATA_DIR)
+    if entries is not None and field_id not in entries:
+        raise UnknownFieldError([field_id])
+
+
+def model_signature():
+    # Changes after every retrain or variant export
+    models = directory_signature(MODEL_DIR, lambda name: name.endswith('.onnx') or name == 'onnx_variants.json')
+    return models + (os.environ.get('SOILFUSION_ONNX_VARIANT', 'auto'),)
+
+
+def result_version():
+    # recommend_planting dates its advice from today, so results also roll over daily
+    payload = repr((data_signature(), model_signature(), date.today().isoformat()))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def cached_analysis(load, field_id, lang="en"):
+    # analyze_field through the result cache; `load` returns the pipeline and is only
+    # called on a miss, so a hit never imports pandas or onnxruntime
+    check_field_id(field_id)
+    if result_cache is None:
+        return analyze_field(load(), field_id, lang)
+    version = result_version()
+    key = f"{field_id}:{lang}:{version}"
+    with recorder.span('result_cache_get'):
+        result = result_cache.get(key)
+    if result is not None:
+        return result
+    result = analyze_field(load(), field_id, lang)
+    result_cache.put(key, result, version)
+    return result
+
+
+class InferenceWorker:
+    """Keeps one preprocessed pipeline in memory and serves many predictions from it."""
+
+    def __init__(self, max_concurrency=4):
+        self.max_concurrency = max_concurrency
+        self.training = TrainingJobs(ROOT_DIR, model_dir=MODEL_DIR)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._reload_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._pipeline = None
+        self._signature = None
+        self.loaded_at = None
+        self.in_flight = 0
+        self.served = 0
+        self.errors = 0
+
+    def get_pipeline(self):
+        signature = data_signature()
+        if self._pipeline is not None and signature == self._signature:
+            return self._pipeline
+        with self._reload_lock:
+            # Another request may have finished the reload while we waited
+            if self._pipeline is None or signature != self._signature:
+                pipeline = load_pipeline()
+                self._pipeline, self._signature = pipeline, signature
+                self.loaded_at = time.time()
+        return self._pipeline
+
+    def warm_up(self):
+        # Preprocessed data plus the yield, anomaly and clustering sessions, so the first
+        # request pays for neither
+        from ml_inference import model_session, resolve_model
+
+        pipeline = self.get_pipeline()
+        for name in WARM_MODELS:
+            if os.path.exists(resolve_model(pipeline.model_dir, name)[0]):
+                model_session(pipeline, name)
+
+    def predict(self, field_id, lang="en", timeout=30, timings=False):
+        return self._run(lambda: cached_analysis(self.get_pipeline, field_id, lang), timeout=timeout, timings=timings)
+
+    def score(self, field_ids='all', timeout=30, timings=False):
+        return self._run(lambda: score_all_fields(self.get_pipeline(), field_ids), timeout=timeout, timings=timings)
+
+    def _run(self, call, timeout=30, timings=False):
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("Inference worker is busy")
+        self._count('in_flight', 1)
+        try:
+            result = run_timed(call, timings)
+            self._count('served', 1)
+            return result
+        except Exception:
+            self._count('errors', 1)
+            raise
+        finally:
+            self._count('in_flight', -1)
+            self._slots.release()
+
+    def _count(self, name, delta):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + delta)
+
+    def health(self):
+        from ml_inference import sessions, field_index
+
+        pipeline = self._pipeline
+        return {
+            "status": "ok" if pipeline is not None else "loading",
+            "fields": len(field_index(pipeline)) if pipeline is not None else 0,
+            "loaded_at": self.loaded_at,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "served": self.served,
+            "errors": self.errors,
+            "models": sessions.stats(),
+            "result_cache": result_cache.stats() if result_cache is not None else None,
+            "training": {k: v for k, v in self.training.list().items() if k != 'jobs'}
+        }
+
+
+def make_handler(worker):
+    class InferenceHandler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_job(self, job):
+            if job is None:
+                return self._send(404, {"error": "Unknown training job"})
+            self._send(200, job)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send(200, worker.health())
+            elif self.path == '/train':
+                self._send(200, worker.training.list())
+            elif self.path.startswith('/train/'):
+                self._send_job(worker.training.status(self.path[len('/train/'):]))
+            elif self.path == '/metrics':
+                body = (recorder.prometheus() + (result_cache.prometheus() if result_cache is not None else "")).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send(404, {"error": "Not found"})
+
+        def do_POST(self):
+            if self.path == '/train':
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                    return self._send(202, worker.training.submit(body.get('mode') or 'full'))
+                except (AttributeError, ValueError) as e:
+                    return self._send(400, {"error": str(e)})
+            if self.path.startswith('/train/') and self.path.endswith('/cancel'):
+                return self._send_job(worker.training.cancel(self.path[len('/train/'):-len('/cancel')]))
+            if self.path not in ('/predict', '/score'):
+                return self._send(404, {"error": "Not found"})
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                if self.path == '/score':
+                    field_ids = parse_field_ids(body.get('field_ids', 'all'))
+                else:
+                    field_id = int(body['field_id'])
+            except (KeyError, TypeError, ValueError):
+                return self._send(400, {"error": "field_id is required" if self.path == '/predict' else "field_ids must be \"all\" or a list of ids"})
+            try:
+                timings = bool(body.get('timings'))
+                if self.path == '/score':
+                    self._send(200, worker.score(field_ids, timings=timings))
+                else:
+                    self._send(200, worker.predict(field_id, body.get('lang') or "en", timings=timings))
+            except UnknownFieldError as e:
+                self._send(404, {"error": str(e)})
+            except TimeoutError as e:
+                self._send(503, {"error": str(e)})
+            except Exception:
+                # The traceback stays in the worker's log; clients only learn that it failed
+                logging.exception(f"{self.path} failed")
+                self._send(500, {"error": "Inference failed"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return InferenceHandler
+
+
+def serve(host='127.0.0.1', port=5100, max_concurrency=4):
+    worker = InferenceWorker(max_concurrency=max_concurrency)
+    # Warm up before accepting traffic so the first request doesn't pay the load cost
+    worker.warm_up()
+    server = ThreadingHTTPServer((host, port), make_handler(worker))
+    print(json.dumps({"status": "ready", "host": host, "port": port}), flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def run_once(argv):
+    # `--timings` anywhere in argv adds a "timings" block to the output
+    timings = '--timings' in argv
+    argv = [a for a in argv if a != '--timings']
+    try:
+        if len(argv) < 1:
+            print(json.dumps({"error": "Field ID required"}))
+            sys.exit(1)
+
+        # `inference.py all` or `inference.py 101,102` scores many fields in one batch
+        if argv[0] == 'all' or ',' in argv[0]:
+            output = run_timed(lambda: score_all_fields(load_pipeline(), parse_field_ids(argv[0])), timings)
+        else:
+            field_id = int(argv[0])
+            lang = argv[1] if len(argv) > 1 else "en"
+            output = run_timed(lambda: cached_analysis(lambda: load_field_pipeline(field_id), field_id, lang), timings)
+        print(json.dumps(output))
+
+    except UnknownFieldError as e:
+        print(json.dumps({"error": str(e), "status": 404}))
+        sys.exit(1)
+    except Exception:
+        # stdout is relayed to the client, so the traceback goes to stderr only
+        logging.exception("Inference failed")
+        print(json.dumps({"error": "Inference failed"}))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--serve':
+        serve(
+            host=os.environ.get('INFERENCE_HOST', '127.0.0.1'),
+            port=int(os.environ.get('INFERENCE_PORT', 5100)),
+            max_concurrency=int(os.environ.get('INFERENCE_MAX_CONCURRENCY', 4))
+        )
+    else:
+        run_once(sys.argv[1:])
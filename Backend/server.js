@@ -153,15 +153,18 @@ app.delete('/api/history/:id', requireAuth, async (req, res) => {
 });
 
 // ── File Upload ─────────────────────────────────────────────────────────────
+// `?mode=append` adds the readings to the existing data instead of replacing it: the file
+// waits in data/incoming/ until an incremental (or full) training run applies it.
+const isAppend = req => req.query.mode === 'append';
 const storage = multer.diskStorage({
     destination: (req, file, cb) => {
-        const uploadPath = path.join(__dirname, '..', 'data');
+        const uploadPath = isAppend(req) ? path.join(__dirname, '..', 'data', 'incoming') : path.join(__dirname, '..', 'data');
         if (!fs.existsSync(uploadPath)) fs.mkdirSync(uploadPath, { recursive: true });
         cb(null, uploadPath);
     },
     filename: (req, file, cb) => {
         const ext = path.extname(file.originalname);
-        cb(null, `sensor_readings${ext}`);
+        cb(null, isAppend(req) ? `${Date.now()}-sensor_readings${ext}` : `sensor_readings${ext}`);
     }
 });
 const upload = multer({ storage });
@@ -170,102 +173,325 @@ app.get('/api/health', (req, res) => res.json({ status: 'ok', message: 'SoilFusi
 
 app.post('/api/upload', upload.single('file'), (req, res) => {
     if (!req.file) return res.status(400).json({ error: 'No file uploaded' });
+    if (isAppend(req)) {
+        return res.json({ message: 'Readings queued; run the pipeline with mode "incremental" to apply them', filename: req.file.filename });
+    }
+    // New sensor data invalidates the processed feature store (it is also fingerprinted by mtime)
+    fs.rmSync(path.join(__dirname, '..', 'data', 'feature_store'), { recursive: true, force: true });
     res.json({ message: 'File uploaded successfully', filename: req.file.filename });
 });
 
 // ── ML Pipeline ─────────────────────────────────────────────────────────────
-app.post('/api/ml/run-pipeline', (req, res) => {
+// The inference worker runs training single-flight (ml_jobs.py): concurrent requests
+// share one run plus at most one queued follow-up, and models are published atomically.
+// Without the worker, requests here do the same with ml_pipeline.py runs: a request for the
+// mode in flight shares that run, any other waits for one follow-up run, which becomes a
+// full run if any of its requests asked for one.
+let pipelineRun = null;     // { mode, promise } of the run in flight
+let pipelineQueued = null;  // { mode, promise } of the follow-up
+
+const spawnPipeline = mode => new Promise(resolve => {
     const mlScriptPath = path.join(__dirname, '..', 'ml_pipeline.py');
     const venvPythonPath = path.join(__dirname, '..', 'venv', 'bin', 'python3');
     const cwdPath = path.join(__dirname, '..');
-    const pythonProcess = spawn(venvPythonPath, [mlScriptPath], { cwd: cwdPath });
+    const args = mode === 'incremental' ? [mlScriptPath, '--incremental'] : [mlScriptPath];
+    const pythonProcess = spawn(venvPythonPath, args, { cwd: cwdPath });
 
     let outputData = '', errorData = '';
     pythonProcess.stdout.on('data', d => { outputData += d.toString(); console.log(`ML: ${d}`); });
     pythonProcess.stderr.on('data', d => { errorData += d.toString(); });
     pythonProcess.on('close', code => {
-        if (code !== 0) return res.status(500).json({ error: 'ML Pipeline failed', details: errorData });
-        res.json({ message: 'ML Pipeline completed', output: outputData });
+        if (code !== 0) return resolve({ status: 500, body: { error: 'ML Pipeline failed', mode, details: errorData } });
+        resolve({ status: 200, body: { message: 'ML Pipeline completed', mode, output: outputData } });
     });
 });
 
-app.post('/api/ml/predict', async (req, res) => {
-    const { field_id, lang } = req.body;
-    if (!field_id) return res.status(400).json({ error: 'field_id is required' });
+const runPipelineOnce = mode => {
+    if (!pipelineRun) {
+        const run = { mode };
+        run.promise = spawnPipeline(mode).finally(() => { pipelineRun = null; });
+        pipelineRun = run;
+        return run.promise;
+    }
+    if (pipelineRun.mode === mode) return pipelineRun.promise;
+    if (!pipelineQueued) {
+        const queued = { mode };
+        queued.promise = pipelineRun.promise.then(() => {
+            pipelineQueued = null;
+            return runPipelineOnce(queued.mode);
+        });
+        pipelineQueued = queued;
+    } else if (mode === 'full') {
+        pipelineQueued.mode = 'full';
+    }
+    return pipelineQueued.promise;
+};
 
+const TRAINING_FINISHED = ['succeeded', 'failed', 'cancelled'];
+
+// Waits for the job by default; `?wait=0` (or {"wait": false}) returns 202 with the job to poll.
+// `?mode=incremental` (or {"mode": "incremental"}) applies appended readings to the current
+// models, falling back to a full retrain when the data has drifted.
+app.post('/api/ml/run-pipeline', async (req, res) => {
+    const wait = req.query.wait !== '0' && req.body?.wait !== false;
+    const mode = req.query.mode || req.body?.mode || 'full';
+    const submitted = await workerRequest('POST', '/train', { mode });
+    if (!submitted) {
+        const { status, body } = await runPipelineOnce(mode);
+        return res.status(status).json(body);
+    }
+    if (submitted.status !== 202) return res.status(submitted.status).json(submitted.body);
+    let job = submitted.body;
+    if (!wait) return res.status(202).json(job);
+
+    while (!TRAINING_FINISHED.includes(job.state)) {
+        await new Promise(r => setTimeout(r, 1000));
+        const r = await workerRequest('GET', `/train/${job.id}`);
+        if (!r) return res.status(503).json({ error: 'Inference worker went away while training', job });
+        job = r.body;
+    }
+    if (job.state !== 'succeeded') return res.status(500).json({ error: `ML Pipeline ${job.state}`, job });
+    res.json({ message: 'ML Pipeline completed', job });
+});
+
+app.get('/api/ml/jobs', async (req, res) => {
+    const r = await workerRequest('GET', '/train');
+    if (!r) return res.status(503).json({ error: 'Inference worker unavailable' });
+    res.status(r.status).json(r.body);
+});
+
+app.get('/api/ml/jobs/:id', async (req, res) => {
+    const r = await workerRequest('GET', `/train/${encodeURIComponent(req.params.id)}`);
+    if (!r) return res.status(503).json({ error: 'Inference worker unavailable' });
+    res.status(r.status).json(r.body);
+});
+
+app.post('/api/ml/jobs/:id/cancel', async (req, res) => {
+    const r = await workerRequest('POST', `/train/${encodeURIComponent(req.params.id)}/cancel`);
+    if (!r) return res.status(503).json({ error: 'Inference worker unavailable' });
+    res.status(r.status).json(r.body);
+});
+
+// ── Inference Worker ────────────────────────────────────────────────────────
+// A long-lived `inference.py --serve` process keeps models and features in memory.
+// If it is down, /api/ml/predict falls back to spawning the one-shot CLI.
+const INFERENCE_PORT = process.env.INFERENCE_PORT || 5100;
+const INFERENCE_URL = `http://127.0.0.1:${INFERENCE_PORT}`;
+let inferenceWorker = null;
+let inferenceWorkerReady = false;
+
+const startInferenceWorker = () => {
+    if (process.env.INFERENCE_WORKER === '0') return;
+    const venvPythonPath = path.join(__dirname, '..', 'venv', 'bin', 'python3');
+    const cwdPath = path.join(__dirname, '..');
+    inferenceWorker = spawn(venvPythonPath, [path.join(__dirname, 'inference.py'), '--serve'], {
+        cwd: cwdPath,
+        env: { ...process.env, INFERENCE_PORT: String(INFERENCE_PORT) },
+    });
+    inferenceWorker.stdout.on('data', d => {
+        if (d.toString().includes('"ready"')) {
+            inferenceWorkerReady = true;
+            console.log(`✅ Inference worker listening on ${INFERENCE_URL}`);
+        }
+    });
+    inferenceWorker.on('error', err => console.error('Inference worker failed to start:', err.message));
+    inferenceWorker.on('close', code => {
+        inferenceWorkerReady = false;
+        inferenceWorker = null;
+        console.warn(`Inference worker exited (code ${code}), restarting in 5s`);
+        setTimeout(startInferenceWorker, 5000);
+    });
+};
+startInferenceWorker();
+process.on('exit', () => inferenceWorker?.kill());
+
+const runInferenceOnce = (field_id, lang, timings) => new Promise(resolve => {
     const inferenceScriptPath = path.join(__dirname, 'inference.py');
     const venvPythonPath = path.join(__dirname, '..', 'venv', 'bin', 'python3');
     const cwdPath = path.join(__dirname, '..');
     const args = [inferenceScriptPath, field_id.toString()];
     if (lang) args.push(lang);
+    if (timings) args.push('--timings');
 
     const pythonProcess = spawn(venvPythonPath, args, { cwd: cwdPath });
     let outputData = '';
     pythonProcess.stdout.on('data', d => { outputData += d.toString(); });
-    pythonProcess.on('close', async code => {
+    pythonProcess.on('close', code => {
         const jsonMatch = outputData.match(/\{[\s\S]*\}/);
         const cleanJson = jsonMatch ? jsonMatch[0] : outputData;
         if (code !== 0) {
             try {
-                const r = JSON.parse(cleanJson);
-                if (r.error) return res.status(500).json(r);
+                const { status = 500, ...r } = JSON.parse(cleanJson);
+                if (r.error) return resolve({ status, body: r });
             } catch (_) { }
-            return res.status(500).json({ error: 'Inference failed', raw: outputData });
+            return resolve({ status: 500, body: { error: 'Inference failed', raw: outputData } });
         }
         try {
-            const results = JSON.parse(cleanJson);
-
-            // ── Save to MongoDB if user is logged in ──────────────────────
-            if (req.isAuthenticated && req.isAuthenticated()) {
-                const latest = results.historical_data?.at?.(-1);
-                await AnalysisHistory.create({
-                    userId: req.user._id,
-                    fieldId: field_id.toString(),
-                    yieldPrediction: results.yield_prediction_kg_per_ha,
-                    anomalyDetected: results.anomaly_detected,
-                    soilHealth: results.anomaly_detected ? 'critical' : 'healthy',
-                    targetCrop: results.recommendation?.Target_Crop,
-                    confidenceScore: results.recommendation?.Confidence_Score,
-                    soilMetrics: {
-                        moisture: latest?.moisture,
-                        ph: latest?.ph,
-                        nitrogen: latest?.nitrogen,
-                        temperature: latest?.temperature,
-                    },
-                    recommendation: results.recommendation,
-                }).catch(err => console.warn('History save skipped:', err.message));
-            }
-
-            res.json(results);
+            resolve({ status: 200, body: JSON.parse(cleanJson) });
         } catch (err) {
-            res.status(500).json({ error: 'Failed to parse inference output', raw: outputData });
+            resolve({ status: 500, body: { error: 'Failed to parse inference output', raw: outputData } });
         }
     });
 });
 
-app.get('/api/ml/fields', (req, res) => {
+// Any worker route; null when the worker is down or unreachable
+const workerRequest = async (method, route, payload) => {
+    if (!inferenceWorkerReady) return null;
+    try {
+        const r = await fetch(`${INFERENCE_URL}${route}`, {
+            method,
+            headers: { 'Content-Type': 'application/json' },
+            body: payload === undefined ? undefined : JSON.stringify(payload),
+        });
+        return { status: r.status, body: await r.json() };
+    } catch (err) {
+        console.warn(`Inference worker unreachable (${route}):`, err.message);
+        return null;
+    }
+};
+
+const callInferenceWorker = async (route, payload) => {
+    if (!inferenceWorkerReady) return null;
+    try {
+        const r = await fetch(`${INFERENCE_URL}${route}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(payload),
+        });
+        // 503 means the worker is saturated — let the one-shot CLI take the overflow
+        if (r.status !== 503) return { status: r.status, body: await r.json() };
+    } catch (err) {
+        console.warn('Inference worker unreachable, using one-shot CLI:', err.message);
+    }
+    return null;
+};
+
+// timings: adds a per-stage "timings" block (wall/CPU time, rows, peak RSS) to the result
+const runInference = async (field_id, lang, timings) =>
+    (await callInferenceWorker('/predict', { field_id, lang, timings })) || runInferenceOnce(field_id, lang, timings);
+
+// field_ids: "all" or an array of ids — scores every field with one model run per model
+const runFieldScoring = async (field_ids, timings) =>
+    (await callInferenceWorker('/score', { field_ids, timings })) ||
+    runInferenceOnce(Array.isArray(field_ids) ? field_ids.join(',') : 'all', null, timings);
+
+app.get('/api/ml/worker-metrics', async (req, res) => {
     try {
-        const filePath = path.join(__dirname, '..', 'data', 'sensor_readings.csv');
-        if (!fs.existsSync(filePath)) return res.json({ fields: [] });
-        const data = fs.readFileSync(filePath, 'utf8');
-        const lines = data.trim().split('\n');
-        if (lines.length < 2) return res.json({ fields: [] });
-
-        const header = lines[0].split(',');
-        const fieldIdx = header.findIndex(c => c.trim() === 'field_id');
-        const farmerIdx = header.findIndex(c => c.trim() === 'farmer_name');
-        if (fieldIdx === -1) return res.json({ fields: [] });
-
-        const fieldMap = new Map();
-        for (let i = 1; i < lines.length; i++) {
-            const cols = lines[i].split(',');
-            const id = cols[fieldIdx]?.trim();
-            if (!id) continue;
-            if (!fieldMap.has(id)) {
-                fieldMap.set(id, farmerIdx !== -1 ? (cols[farmerIdx]?.trim() || id) : id);
-            }
+        const r = await fetch(`${INFERENCE_URL}/metrics`);
+        res.status(r.status).type('text/plain; version=0.0.4').send(await r.text());
+    } catch (err) {
+        res.status(503).json({ status: 'down', error: err.message });
+    }
+});
+
+app.get('/api/ml/worker-health', async (req, res) => {
+    try {
+        const r = await fetch(`${INFERENCE_URL}/health`);
+        res.status(r.status).json(await r.json());
+    } catch (err) {
+        res.status(503).json({ status: 'down', error: err.message });
+    }
+});
+
+app.post('/api/ml/predict', async (req, res) => {
+    const { field_id, lang, timings } = req.body;
+    if (!field_id) return res.status(400).json({ error: 'field_id is required' });
+
+    const { status, body: results } = await runInference(field_id, lang, Boolean(timings));
+    if (status !== 200) return res.status(status).json(results);
+
+    // ── Save to MongoDB if user is logged in ──────────────────────
+    if (req.isAuthenticated && req.isAuthenticated()) {
+        const latest = results.historical_data?.at?.(-1);
+        await AnalysisHistory.create({
+            userId: req.user._id,
+            fieldId: field_id.toString(),
+            yieldPrediction: results.yield_prediction_kg_per_ha,
+            anomalyDetected: results.anomaly_detected,
+            soilHealth: results.anomaly_detected ? 'critical' : 'healthy',
+            targetCrop: results.recommendation?.Target_Crop,
+            confidenceScore: results.recommendation?.Confidence_Score,
+            soilMetrics: {
+                moisture: latest?.moisture,
+                ph: latest?.ph,
+                nitrogen: latest?.nitrogen,
+                temperature: latest?.temperature,
+            },
+            recommendation: results.recommendation,
+        }).catch(err => console.warn('History save skipped:', err.message));
+    }
+
+    res.json(results);
+});
+
+app.post('/api/ml/score-fields', async (req, res) => {
+    const { field_ids, timings } = req.body || {};
+    const { status, body } = await runFieldScoring(field_ids || 'all', Boolean(timings));
+    res.status(status).json(body);
+});
+
+// Returns [{id, name}] from a CSV with a field_id column (and optional farmer_name), or null
+const readFieldList = (filePath) => {
+    if (!fs.existsSync(filePath)) return null;
+    const data = fs.readFileSync(filePath, 'utf8');
+    const lines = data.trim().split('\n');
+    if (lines.length < 2) return [];
+
+    const header = lines[0].split(',');
+    const fieldIdx = header.findIndex(c => c.trim() === 'field_id');
+    const farmerIdx = header.findIndex(c => c.trim() === 'farmer_name');
+    if (fieldIdx === -1) return null;
+
+    const fieldMap = new Map();
+    for (let i = 1; i < lines.length; i++) {
+        const cols = lines[i].split(',');
+        const id = cols[fieldIdx]?.trim();
+        if (!id) continue;
+        if (!fieldMap.has(id)) {
+            fieldMap.set(id, farmerIdx !== -1 ? (cols[farmerIdx]?.trim() || id) : id);
+        }
+    }
+    return Array.from(fieldMap.entries()).map(([id, name]) => ({ id, name }));
+};
+
+// data/field_manifest.json (see ml_manifest.py), parsed once per rewrite. Null when it is
+// missing or a sensor_readings file changed since it was built: the manifest records the
+// size and mtime of the files it summarizes.
+let fieldManifestCache = null;
+const readFieldManifest = (dataDir) => {
+    const manifestPath = path.join(dataDir, 'field_manifest.json');
+    if (!fs.existsSync(manifestPath)) return null;
+    const stat = fs.statSync(manifestPath);
+    if (!fieldManifestCache || fieldManifestCache.mtimeMs !== stat.mtimeMs || fieldManifestCache.size !== stat.size) {
+        fieldManifestCache = { mtimeMs: stat.mtimeMs, size: stat.size, manifest: JSON.parse(fs.readFileSync(manifestPath, 'utf8')) };
+    }
+    const { manifest } = fieldManifestCache;
+    for (const name of ['sensor_readings.parquet', 'sensor_readings.csv']) {
+        const filePath = path.join(dataDir, name);
+        const recorded = manifest.source?.[name];
+        if (!fs.existsSync(filePath)) {
+            if (recorded) return null;
+            continue;
         }
-        res.json({ fields: Array.from(fieldMap.entries()).map(([id, name]) => ({ id, name })) });
+        const current = fs.statSync(filePath, { bigint: true });
+        if (!recorded || String(current.size) !== String(recorded.size) || String(current.mtimeNs) !== recorded.mtime_ns) return null;
+    }
+    return manifest;
+};
+
+app.get('/api/ml/fields', (req, res) => {
+    try {
+        const dataDir = path.join(__dirname, '..', 'data');
+        // The pipeline keeps a field manifest current on ingest (and for Farmer sheets, which
+        // have no field_id column); until it has seen a new upload, scan sensor_readings.csv.
+        const manifest = readFieldManifest(dataDir);
+        const fields = manifest
+            ? manifest.fields.map(f => ({
+                id: String(f.field_id), name: f.farmer_name, soil_type: f.soil_type,
+                rows: f.rows, first_date: f.first_date, last_date: f.last_date,
+            }))
+            : readFieldList(path.join(dataDir, 'sensor_readings.csv')) ?? [];
+        res.json({ fields });
     } catch {
         res.status(500).json({ error: 'Failed to fetch fields' });
     }
@@ -0,0 +1,101 @@
+"""Benchmark for the K selection in SoilFusionMLPipeline.train_soil_clustering.
+
+Times the clustering stage at several sizes (the exact mode below
+CLUSTERING_EXACT_MAX_ROWS, MiniBatchKMeans + sampled silhouette above it) and, up to
+--legacy-max-rows, the previous sweep: full KMeans and full silhouette for every K,
+then a refit of the winner. scikit-learn and skl2onnx are imported before anything is
+timed, and the stage's ONNX export (which the previous sweep didn't do) is reported
+separately, so "K selection" compares like with like. Times are medians of --repeats
+runs; the stage's peak allocation is traced in one extra, untimed run.
+
+    python benchmarks/bench_clustering.py [--rows 10000 50000 500000] [--legacy-max-rows 10000]
+        [--repeats 3]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_features import make_raw_df
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_metrics import recorder
+from ml_pipeline import SoilFusionMLPipeline
+
+FEATURES = ['moisture', 'ph', 'nitrogen', 'temperature', 'rainfall']
+
+
+def legacy_sweep(df):
+    from sklearn.cluster import KMeans
+    from sklearn.metrics import silhouette_score
+    from sklearn.preprocessing import StandardScaler
+
+    X = df[FEATURES].fillna(df[FEATURES].mean())
+    X_scaled = StandardScaler().fit_transform(X)
+    best_k, best_score = 3, -1
+    for k in range(2, 6):
+        score = silhouette_score(X_scaled, KMeans(n_clusters=k, random_state=42, n_init=10).fit_predict(X_scaled))
+        if score > best_score:
+            best_k, best_score = k, score
+    KMeans(n_clusters=best_k, random_state=42, n_init=10).fit_predict(X_scaled)
+    return best_k
+
+
+def timed(call, repeats):
+    # Median wall time over repeats, and the last call's result
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = call()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times)), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 50_000, 500_000])
+    parser.add_argument('--legacy-max-rows', type=int, default=10_000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    # Import costs (~2 s) would otherwise land on whichever is timed first
+    import sklearn.cluster, sklearn.metrics, skl2onnx  # noqa: F401
+
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"{'rows':>10}{'stage s':>9}{'export s':>10}{'K selection s':>15}{'peak alloc MB':>15}{'K':>4}"
+          f"{'previous sweep s':>18}{'K':>4}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            pipeline = SoilFusionMLPipeline(data_dir=tmp, model_dir=tmp, plots_dir=tmp)
+            pipeline.raw_df = make_raw_df(max(1, rows // 100), 100)
+            pipeline.preprocess_data()
+
+            def stage():
+                with recorder.collect() as spans:
+                    pipeline.train_soil_clustering()
+                return sum(s['wall_s'] for s in spans if s['name'] == 'onnx_export')
+
+            new_s, export_s = timed(stage, args.repeats)
+            new_k = pipeline.models['clustering_model'].named_steps['model'].n_clusters
+            # Separate, untimed pass: tracemalloc slows the stage down
+            tracemalloc.start()
+            pipeline.train_soil_clustering()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+
+            legacy = "skipped"
+            if rows <= args.legacy_max_rows:
+                old_s, old_k = timed(lambda: legacy_sweep(pipeline.processed_df), args.repeats)
+                legacy = f"{old_s:>18.2f}{old_k:>4}"
+        print(f"{len(pipeline.processed_df):>10,}{new_s:>9.2f}{export_s:>10.2f}{new_s - export_s:>15.2f}"
+              f"{peak_mb:>15.0f}{new_k:>4}{legacy:>22}")
+
+
+if __name__ == '__main__':
+    main()
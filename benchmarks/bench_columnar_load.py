@@ -0,0 +1,70 @@
+"""Load-time benchmark for the typed Parquet tables written by SoilFusionMLPipeline.ingest_files.
+
+Writes a raw sensor export as CSV, loads it in a fresh process, converts it once with
+ingest_files(), then loads the Parquet tables in fresh processes (whole and streamed).
+Reports wall time and peak RSS and checks the daily frames agree to float32 precision.
+
+    python benchmarks/bench_columnar_load.py [--fields 500] [--days 120] [--readings-per-day 48] [--legacy]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_streaming_ingest import ROOT, run, write_export
+
+sys.path.insert(0, ROOT)
+from ml_pipeline import SoilFusionMLPipeline
+
+
+def assert_frames_close(expected, actual):
+    assert list(expected.columns) == list(actual.columns), "column order differs"
+    assert len(expected) == len(actual), "row count differs"
+    for col in expected.columns:
+        if pd.api.types.is_float_dtype(expected[col]):
+            np.testing.assert_allclose(actual[col].to_numpy(float), expected[col].to_numpy(), rtol=1e-6, atol=1e-4, err_msg=col)
+        else:
+            assert (actual[col].astype(object).fillna('').astype(str).to_numpy() == expected[col].astype(object).fillna('').astype(str).to_numpy()).all(), col
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fields', type=int, default=500)
+    parser.add_argument('--days', type=int, default=120)
+    parser.add_argument('--readings-per-day', type=int, default=48)
+    parser.add_argument('--chunksize', type=int, default=200_000)
+    parser.add_argument('--legacy', action='store_true', help="parameter/value long format + weather_data.csv")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as tmp:
+        write_export(tmp, args.fields, args.days, args.readings_per_day, args.legacy)
+        csv_mb = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp) if f.endswith('.csv')) / 1e6
+        results = [('csv', run(tmp, None, os.path.join(tmp, 'csv.pkl')))]
+
+        t0 = time.perf_counter()
+        SoilFusionMLPipeline(data_dir=tmp, model_dir=tmp, plots_dir=tmp).ingest_files()
+        ingest_s = time.perf_counter() - t0
+        parquet_mb = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp) if f.endswith('.parquet')) / 1e6
+
+        results.append(('parquet', run(tmp, None, os.path.join(tmp, 'parquet.pkl'))))
+        results.append(('parquet-chunked', run(tmp, args.chunksize, os.path.join(tmp, 'chunked.pkl'))))
+        expected = pd.read_pickle(os.path.join(tmp, 'csv.pkl'))
+        for name in ['parquet', 'chunked']:
+            assert_frames_close(expected, pd.read_pickle(os.path.join(tmp, f'{name}.pkl')))
+
+    print(f"on disk: {csv_mb:,.0f} MB csv, {parquet_mb:,.0f} MB parquet (one-off ingest {ingest_s:.2f}s)")
+    print(f"{'source':<18}{'seconds':>10}{'peak RSS MB':>14}{'field-days':>12}")
+    for name, stats in results:
+        print(f"{name:<18}{stats['seconds']:>10.2f}{stats['peak_rss_mb']:>14.0f}{stats['field_days']:>12,}")
+    print("daily frames match (float32 tolerance)")
+
+
+if __name__ == '__main__':
+    main()
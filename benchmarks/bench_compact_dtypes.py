@@ -0,0 +1,109 @@
+"""Memory of raw_df / processed_df with and without compact dtypes, and the effect on models.
+
+Loads one generated CSV dataset twice, with SoilFusionMLPipeline(compact=False) (float64,
+int64, object strings) and compact=True (float32, int32, small ints, categoricals). For
+each it reports the in-memory size of raw_df and processed_df and the peak memory
+allocated while loading and preprocessing. Both pipelines are then trained and their
+scores for every field compared: yield predictions, anomaly flags and soil clusters.
+
+    python benchmarks/bench_compact_dtypes.py [--fields 2000] [--days 365]
+        [--yield-tolerance 0.01] [--label-tolerance 0.01]
+"""
+import argparse
+import itertools
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_pipeline import SoilFusionMLPipeline
+from ml_inference import score_fields
+
+
+def frame_mb(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def cluster_agreement(a, b):
+    # Cluster ids are arbitrary: best agreement over relabelings of b
+    labels = np.unique(np.r_[a, b])
+    best = 0.0
+    for perm in itertools.permutations(labels):
+        mapping = dict(zip(labels, perm))
+        best = max(best, float(np.mean(a == np.vectorize(mapping.get)(b))))
+    return best
+
+
+def run(data_dir, model_dir, compact):
+    pipeline = SoilFusionMLPipeline(data_dir=data_dir, model_dir=model_dir, plots_dir=model_dir, plots='off', compact=compact)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    pipeline.load_data()
+    pipeline.preprocess_data()
+    prep_s = time.perf_counter() - t0
+    peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+
+    t0 = time.perf_counter()
+    pipeline.train_all(parallel=False)
+    train_s = time.perf_counter() - t0
+    return pipeline, {
+        'raw_df_mb': frame_mb(pipeline.raw_df),
+        'processed_df_mb': frame_mb(pipeline.processed_df),
+        'prep_peak_mb': peak_mb,
+        'prep_s': prep_s,
+        'train_s': train_s
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fields', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--yield-tolerance', type=float, default=0.01,
+                        help="max mean |difference| of yield predictions, relative to their mean")
+    parser.add_argument('--label-tolerance', type=float, default=0.01,
+                        help="max share of fields whose anomaly flag or cluster differs")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, 'data')
+        SoilFusionMLPipeline(data_dir=data_dir, model_dir=os.path.join(tmp, 'gen'), plots_dir=os.path.join(tmp, 'gen'),
+                             plots='off').generate_synthetic_data(num_fields=args.fields, days=args.days)
+        results, scores = {}, {}
+        for compact in [False, True]:
+            name = 'compact' if compact else 'wide'
+            pipeline, results[name] = run(data_dir, os.path.join(tmp, name), compact)
+            scores[name] = score_fields('all', pipeline)
+            print(f"{name}: {len(pipeline.processed_df):,} rows, dtypes "
+                  f"{dict(pipeline.processed_df.dtypes.astype(str).value_counts())}")
+
+    print(f"\n{args.fields:,} fields x {args.days} days")
+    print(f"{'':<18}{'wide':>12}{'compact':>12}{'saved':>9}")
+    for key, label in [('raw_df_mb', 'raw_df MB'), ('processed_df_mb', 'processed_df MB'), ('prep_peak_mb', 'peak alloc MB'),
+                       ('prep_s', 'load+prep s'), ('train_s', 'train s')]:
+        wide, compact = results['wide'][key], results['compact'][key]
+        print(f"{label:<18}{wide:>12.2f}{compact:>12.2f}{1 - compact / wide:>9.0%}")
+
+    wide, compact = scores['wide'], scores['compact']
+    yield_error = float(np.mean(np.abs(compact['yield_prediction_kg_per_ha'] - wide['yield_prediction_kg_per_ha']))
+                        / np.mean(np.abs(wide['yield_prediction_kg_per_ha'])))
+    anomaly_diff = float(np.mean(compact['anomaly_detected'] != wide['anomaly_detected']))
+    cluster_diff = 1 - cluster_agreement(wide['soil_cluster'].to_numpy(), compact['soil_cluster'].to_numpy()) \
+        if 'soil_cluster' in wide and 'soil_cluster' in compact else 0.0
+    print(f"\nyield predictions : mean |diff| {yield_error:.4%} of the mean (tolerance {args.yield_tolerance:.2%})")
+    print(f"anomaly flags     : {anomaly_diff:.2%} of fields differ (tolerance {args.label_tolerance:.2%})")
+    print(f"soil clusters     : {cluster_diff:.2%} of fields differ (tolerance {args.label_tolerance:.2%})")
+    ok = yield_error <= args.yield_tolerance and anomaly_diff <= args.label_tolerance and cluster_diff <= args.label_tolerance
+    print("model outputs within tolerance" if ok else "MODEL OUTPUTS OUT OF TOLERANCE")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
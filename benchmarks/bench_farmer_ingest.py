@@ -0,0 +1,95 @@
+"""Benchmark for the Farmer-format branch of SoilFusionMLPipeline.load_data.
+
+Writes a synthetic co-op sheet (Farmer, N, P, K, pH, Temp, Rain, Soil_Type, one row
+per reading, no timestamps), loads it, and compares the date assignment with the
+previous per-farmer filter loop.
+
+    python benchmarks/bench_farmer_ingest.py [--farmers 20000] [--rows-per-farmer 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_pipeline import SoilFusionMLPipeline
+
+
+def write_farmer_sheet(data_dir, farmers, rows_per_farmer, seed=42):
+    rng = np.random.default_rng(seed)
+    n = farmers * rows_per_farmer
+    # Interleave farmers so rows of one farmer are not contiguous, as in real co-op sheets
+    names = np.array([f"Farmer {i:06d}" for i in range(farmers)])
+    sheet = pd.DataFrame({
+        'Farmer': names[rng.permutation(np.repeat(np.arange(farmers), rows_per_farmer))],
+        'N': rng.normal(50, 10, n).round(1),
+        'P': rng.normal(30, 5, n).round(1),
+        'K': rng.normal(40, 8, n).round(1),
+        'pH': rng.normal(6.5, 0.5, n).round(2),
+        'Temp': rng.normal(25, 4, n).round(1),
+        'Rain': rng.exponential(80, n).round(1),
+        'Soil_Type': rng.choice(['Clay', 'Loam', 'Sandy'], n),
+    })
+    sheet.to_csv(os.path.join(data_dir, 'sensor_readings.csv'), index=False)
+    pd.DataFrame({'field_id': [1], 'soil_type': ['Loam']}).to_csv(os.path.join(data_dir, 'fields.csv'), index=False)
+    pd.DataFrame({'field_id': [1], 'crop_id': [300001], 'yield_value': [4000], 'season': ['Kharif'], 'year': [2023]}).to_csv(os.path.join(data_dir, 'yield_history.csv'), index=False)
+    pd.DataFrame({'crop_id': [300001], 'crop_name': ['Wheat'], 'growth_period_days': [120]}).to_csv(os.path.join(data_dir, 'crops.csv'), index=False)
+    return sheet
+
+
+def legacy_dates(df, end):
+    df = df.copy()
+    df['date'] = pd.NaT
+    for fid in df['field_id'].unique():
+        n_rows = len(df[df['field_id'] == fid])
+        dates = pd.date_range(end=end, periods=n_rows, freq='D')
+        df.loc[df['field_id'] == fid, 'date'] = dates
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--farmers', type=int, default=20000)
+    parser.add_argument('--rows-per-farmer', type=int, default=5)
+    parser.add_argument('--skip-legacy', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_farmer_sheet(tmp, args.farmers, args.rows_per_farmer)
+        before = os.stat(os.path.join(tmp, 'sensor_readings.csv')).st_mtime_ns
+        pipeline = SoilFusionMLPipeline(data_dir=tmp, model_dir=tmp, plots_dir=tmp)
+
+        t0 = time.perf_counter()
+        raw_df = pipeline.load_data()
+        load_s = time.perf_counter() - t0
+        assert os.stat(os.path.join(tmp, 'sensor_readings.csv')).st_mtime_ns == before, "sensor_readings.csv was rewritten"
+
+        end = raw_df['date'].max()
+        t0 = time.perf_counter()
+        new = pipeline._normalize_farmer_sheet(pipeline.sensor_readings, end)
+        normalize_s = time.perf_counter() - t0
+        sheet = pipeline.sensor_readings.copy()
+        sheet['field_id'] = new['field_id'].to_numpy()
+
+    print(f"{len(raw_df):,} rows, {raw_df['field_id'].nunique():,} farmers")
+    print(f"load_data          : {load_s:8.2f}s")
+    print(f"date assignment    : {normalize_s:8.2f}s (bulk)")
+    if args.skip_legacy:
+        return
+
+    t0 = time.perf_counter()
+    old = legacy_dates(sheet, end)
+    legacy_s = time.perf_counter() - t0
+    print(f"date assignment    : {legacy_s:8.2f}s (per-farmer loop)")
+    print(f"speedup            : {legacy_s / normalize_s:8.1f}x")
+
+    assert (old['date'].to_numpy() == new['date'].to_numpy()).all()
+    print("dates match")
+
+
+if __name__ == '__main__':
+    main()
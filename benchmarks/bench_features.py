@@ -0,0 +1,106 @@
+"""Benchmark for SoilFusionMLPipeline.preprocess_data.
+
+Compares the vectorized rolling-window feature engine with the previous
+groupby().transform(lambda ...) implementation on a synthetic daily frame and checks
+that both produce the same columns: to 1e-9 with --no-compact, and to float32 precision
+in the default compact mode, which stores the feature columns as float32.
+
+    python benchmarks/bench_features.py [--fields 10000] [--days 365] [--no-compact]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_pipeline import SoilFusionMLPipeline
+
+
+def make_raw_df(num_fields, days, seed=42):
+    rng = np.random.default_rng(seed)
+    n = num_fields * days
+    dates = pd.date_range(end=pd.Timestamp.today().normalize(), periods=days, freq='D')
+    df = pd.DataFrame({
+        'field_id': np.repeat(np.arange(100001, 100001 + num_fields), days),
+        'date': np.tile(dates.values, num_fields),
+        'moisture': rng.normal(25, 5, n),
+        'ph': rng.normal(6.5, 0.5, n),
+        'nitrogen': rng.normal(50, 10, n),
+        'temperature': rng.normal(25, 5, n),
+        'rainfall': rng.exponential(5, n),
+        'humidity': rng.normal(60, 10, n),
+    })
+    # A few gaps so NaN handling is exercised too
+    df.loc[rng.choice(n, size=max(1, n // 1000), replace=False), 'ph'] = np.nan
+    df['soil_type'] = np.array(['Clay', 'Loam', 'Sandy'])[df['field_id'] % 3]
+    return df
+
+
+def legacy_preprocess(raw_df):
+    df = raw_df.copy().sort_values(by=['field_id', 'date']).reset_index(drop=True)
+
+    df['day_of_year'] = df['date'].dt.dayofyear
+    df['month'] = df['date'].dt.month
+    df['season'] = df['month'].apply(lambda x: 'Kharif' if x in [6,7,8,9] else ('Rabi' if x in [10,11,12,1,2,3] else 'Zaid'))
+    df['year'] = df['date'].dt.year
+
+    roll_mean = df.groupby('field_id')[['moisture', 'ph', 'nitrogen']].transform(lambda x: x.rolling(7, min_periods=1).mean())
+    roll_mean.columns = [f'roll_mean_{c}' for c in roll_mean.columns]
+
+    roll_std = df.groupby('field_id')[['moisture', 'ph', 'nitrogen']].transform(lambda x: x.rolling(14, min_periods=1).std().fillna(0))
+    roll_std.columns = [f'roll_std_{c}' for c in roll_std.columns]
+
+    df = pd.concat([df, roll_mean, roll_std], axis=1)
+
+    df['trend_slope_moisture'] = df.groupby('field_id')['moisture'].transform(lambda x: (x - x.shift(7)) / 7).fillna(0)
+
+    avg_std = df[['roll_std_moisture', 'roll_std_ph', 'roll_std_nitrogen']].mean(axis=1)
+    df['stability_score'] = 1 / (avg_std + 1)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fields', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--skip-legacy', action='store_true', help="only time the vectorized engine")
+    parser.add_argument('--no-compact', action='store_true', help="keep the feature columns float64")
+    args = parser.parse_args()
+
+    raw_df = make_raw_df(args.fields, args.days)
+    print(f"{len(raw_df):,} rows ({args.fields:,} fields x {args.days} days)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = SoilFusionMLPipeline(data_dir=tmp, model_dir=tmp, plots_dir=tmp, compact=not args.no_compact)
+        pipeline.raw_df = raw_df
+
+        t0 = time.perf_counter()
+        new = pipeline.preprocess_data()
+        new_s = time.perf_counter() - t0
+    print(f"vectorized : {new_s:8.2f}s")
+
+    if args.skip_legacy:
+        return
+
+    t0 = time.perf_counter()
+    old = legacy_preprocess(raw_df)
+    old_s = time.perf_counter() - t0
+    print(f"legacy     : {old_s:8.2f}s")
+    print(f"speedup    : {old_s / new_s:8.1f}x")
+
+    assert list(old.columns) == list(new.columns), "column order differs"
+    tolerance = 1e-9 if args.no_compact else 1e-5
+    for col in old.columns:
+        if pd.api.types.is_float_dtype(old[col]):
+            np.testing.assert_allclose(new[col].to_numpy(np.float64), old[col].to_numpy(), rtol=tolerance, atol=tolerance, err_msg=col)
+        else:
+            assert (new[col].astype(str).to_numpy() == old[col].astype(str).to_numpy()).all(), col
+    print(f"outputs match (rtol {tolerance:g})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Single-field inference load: per-field store vs the whole feature store.
+
+For each fleet size and history length, builds the feature store and the per-field store
+from a synthetic daily frame, then times what a one-shot single-field request loads:
+load_features (every field's processed rows) against load_field (one field's last days,
+features recomputed). Checks that load_field's rows equal the last FIELD_TAIL_ROWS rows
+load_features gives for the same field.
+
+    python benchmarks/bench_field_load.py [--fields 1000,4000,10000] [--days 90,365]
+        [--repeats 20] [--no-compact]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_features import make_raw_df
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_pipeline import SoilFusionMLPipeline, FIELD_TAIL_ROWS, compact_dtypes
+
+
+def median_time(call, repeats):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times))
+
+
+def run(num_fields, days, repeats, compact):
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, 'data')
+        os.makedirs(data_dir)
+        # The small tables load_features reads alongside the features
+        pd.DataFrame({'crop_id': [300001], 'crop_name': ['Wheat']}).to_csv(os.path.join(data_dir, 'crops.csv'), index=False)
+        pd.DataFrame({'field_id': [100001], 'soil_type': ['Clay']}).to_csv(os.path.join(data_dir, 'fields.csv'), index=False)
+        pd.DataFrame({'field_id': [100001], 'yield_value': [0.0]}).to_csv(os.path.join(data_dir, 'yield_history.csv'), index=False)
+
+        def pipeline():
+            return SoilFusionMLPipeline(data_dir=data_dir, model_dir=tmp, plots_dir=tmp, plots='off', compact=compact)
+
+        builder = pipeline()
+        builder.source_fingerprint = builder.compute_source_fingerprint()
+        raw_df = make_raw_df(num_fields, days)
+        builder.raw_df = compact_dtypes(raw_df) if compact else raw_df
+        t0 = time.perf_counter()
+        builder.preprocess_data()
+        build_s = time.perf_counter() - t0
+
+        field_id = 100001 + num_fields // 2
+        full_s = median_time(lambda: pipeline().load_features(), repeats)
+        field_s = median_time(lambda: pipeline().load_field(field_id), repeats)
+
+        single = pipeline()
+        assert single.load_field(field_id), "per-field store not current"
+        full = builder.processed_df
+        expected = full[full['field_id'] == field_id].tail(FIELD_TAIL_ROWS).reset_index(drop=True)
+        got = single.processed_df
+        for column in got.columns:
+            a, b = got[column], expected[column]
+            if isinstance(a.dtype, pd.CategoricalDtype):
+                a, b = a.astype(str), b.astype(str)
+            if compact:
+                assert a.equals(b), (num_fields, days, column)
+            elif a.dtype.kind == 'f':
+                np.testing.assert_allclose(a, b, rtol=1e-12, atol=1e-12, err_msg=column)
+            else:
+                assert a.equals(b), (num_fields, days, column)
+    return build_s, full_s, field_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fields', default='1000,4000,10000')
+    parser.add_argument('--days', default='90,365')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--no-compact', action='store_true')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    print(f"{'fields':>8}{'days':>6}{'build s':>10}{'load_features ms':>18}{'load_field ms':>15}{'speedup':>9}")
+    for days in [int(d) for d in args.days.split(',')]:
+        for num_fields in [int(f) for f in args.fields.split(',')]:
+            build_s, full_s, field_s = run(num_fields, days, args.repeats, not args.no_compact)
+            print(f"{num_fields:>8,}{days:>6}{build_s:>10.2f}{full_s * 1000:>18.1f}{field_s * 1000:>15.1f}{full_s / field_s:>8.0f}x")
+    print("field-scoped rows match" + (" (to the bit)" if not args.no_compact else " (float64, rtol 1e-12)"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Per-field lookup benchmark for the FieldIndex built over processed_df.
+
+Times the lookups one inference run makes (all rows of a field, its latest row and its
+last 7 rows) with the previous df[df['field_id'] == field_id] scan and with the index,
+and checks both return the same rows.
+
+    python benchmarks/bench_field_lookup.py [--fields 10000] [--days 365] [--lookups 200]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_features import make_raw_df
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_pipeline import SoilFusionMLPipeline
+from ml_inference import field_index
+
+
+def scan_lookups(df, field_id):
+    rows = df[df['field_id'] == field_id]
+    return rows, df[df['field_id'] == field_id].iloc[[-1]], df[df['field_id'] == field_id].tail(7)
+
+
+def index_lookups(pipeline, field_id):
+    index = field_index(pipeline)
+    return index.rows(field_id), index.last(field_id), index.tail(field_id, 7)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fields', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--lookups', type=int, default=200)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = SoilFusionMLPipeline(data_dir=tmp, model_dir=tmp, plots_dir=tmp)
+        pipeline.raw_df = make_raw_df(args.fields, args.days)
+        df = pipeline.preprocess_data()
+    print(f"{len(df):,} rows ({args.fields:,} fields x {args.days} days)")
+
+    t0 = time.perf_counter()
+    pipeline.field_index = None
+    field_index(pipeline)
+    build_s = time.perf_counter() - t0
+
+    field_ids = np.random.default_rng(0).choice(df['field_id'].unique(), size=args.lookups)
+    t0 = time.perf_counter()
+    scanned = [scan_lookups(df, f) for f in field_ids]
+    scan_s = (time.perf_counter() - t0) / args.lookups
+    t0 = time.perf_counter()
+    indexed = [index_lookups(pipeline, f) for f in field_ids]
+    index_s = (time.perf_counter() - t0) / args.lookups
+
+    print(f"index build      : {build_s * 1e3:10.1f} ms (once)")
+    print(f"boolean scan     : {scan_s * 1e3:10.3f} ms per field")
+    print(f"field index      : {index_s * 1e3:10.3f} ms per field")
+    print(f"speedup          : {scan_s / index_s:10.1f}x")
+
+    for old, new in zip(scanned, indexed):
+        for a, b in zip(old, new):
+            pd.testing.assert_frame_equal(a, b)
+    print("lookups match")
+
+
+if __name__ == '__main__':
+    main()
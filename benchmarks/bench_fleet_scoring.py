@@ -0,0 +1,78 @@
+"""Fleet-wide planting recommendation benchmark.
+
+Times recommend_planting called field by field (7-row tail, one anomaly run and the
+confidence arithmetic per field) against recommend_planting_batch, which scores every
+field in one pass, and checks that both return the same recommendations and that the
+batched 7-day means equal the per-field ones bit for bit.
+
+The per-field time is measured on --sample fields and scaled to the whole fleet.
+
+    python benchmarks/bench_fleet_scoring.py [--fields 10000] [--days 30] [--sample 500]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_features import make_raw_df
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_pipeline import SoilFusionMLPipeline
+from ml_inference import field_index, recommend_planting, recommend_planting_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fields', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--sample', type=int, default=500)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = SoilFusionMLPipeline(data_dir=tmp, model_dir=tmp, plots_dir=tmp, plots='off')
+        pipeline.raw_df = make_raw_df(args.fields, args.days)
+        pipeline.crops = pd.DataFrame({'crop_id': [300001], 'crop_name': ['Wheat']})
+        df = pipeline.preprocess_data()
+        pipeline.train_anomaly_detection()
+        print(f"{len(df):,} rows ({args.fields:,} fields x {args.days} days)")
+
+        index = field_index(pipeline)
+        field_ids = index.field_ids
+        sample = np.random.default_rng(0).choice(field_ids, size=min(args.sample, len(field_ids)), replace=False)
+        # Warm the session and the index so both sides time scoring only
+        recommend_planting(int(sample[0]), pipeline)
+        recommend_planting_batch(sample[:1], pipeline)
+
+        t0 = time.perf_counter()
+        per_field = [recommend_planting(int(f), pipeline) for f in sample]
+        per_field_s = (time.perf_counter() - t0) / len(sample) * len(field_ids)
+
+        t0 = time.perf_counter()
+        batch = recommend_planting_batch('all', pipeline)
+        batch_s = time.perf_counter() - t0
+
+    print(f"per field        : {per_field_s:10.3f} s for all fields (from {len(sample)} fields)")
+    print(f"batch            : {batch_s:10.3f} s for all fields")
+    print(f"speedup          : {per_field_s / batch_s:10.1f}x")
+
+    by_field = batch.set_index('Field_ID', drop=False)
+    assert [by_field.loc[int(f)].to_dict() for f in sample] == per_field, "recommendations differ"
+    columns = ['moisture', 'ph', 'nitrogen', 'stability_score']
+    means = index.tail_means(sample, columns, 7)
+    for f in sample:
+        tail = index.tail(f, 7)
+        for column in columns:
+            expected, got = tail[column].mean(), means.at[f, column]
+            assert expected == got or (np.isnan(expected) and np.isnan(got)), (f, column, expected, got)
+    print("recommendations match")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Load time and latency of the ONNX model variants written by export_onnx_variants.
+
+For every model in models/onnx_variants.json and each variant the release kept (the
+base export and the selected one), a fresh
+interpreter loads the session (so nothing is warm) and runs one batch of the latest
+row per field and a single row; the median over --runs is reported next to the
+validation error recorded at export time and the variant inference would serve.
+
+    python benchmarks/bench_onnx_variants.py [--runs 3] [--batch 1000]
+
+Run from the repository root after `SOILFUSION_ONNX_VARIANTS=on python ml_pipeline.py`
+has trained and exported the models.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, sys, logging, warnings
+warnings.filterwarnings('ignore')
+sys.path.insert(0, {root!r})
+logging.getLogger().setLevel(logging.ERROR)
+from ml_pipeline import SoilFusionMLPipeline, benchmark_onnx
+from ml_inference import latest_field_rows, _yield_inputs, _anomaly_inputs
+pipeline = SoilFusionMLPipeline(data_dir='data', model_dir='models', plots_dir='plots')
+pipeline.load_features()
+rows = latest_field_rows('all', pipeline).head({batch})
+X = _yield_inputs(rows, pipeline) if {model!r} == 'yield_model' else _anomaly_inputs(rows)
+_, stats = benchmark_onnx({path!r}, X, {level!r})
+print(json.dumps(stats))
+'''
+
+
+def measure(model, path, level, batch):
+    code = PROBE.format(root=ROOT, model=model, path=path, level=level, batch=batch)
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr[-2000:])
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--batch', type=int, default=1000, help="fields per batch")
+    args = parser.parse_args()
+
+    manifest_path = os.path.join(ROOT, 'models', 'onnx_variants.json')
+    if not os.path.exists(manifest_path):
+        sys.exit("models/onnx_variants.json not found; run SOILFUSION_ONNX_VARIANTS=on python ml_pipeline.py first")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    print(f"{'model':<18}{'variant':<12}{'load s':>9}{'batch ms':>11}{'row ms':>9}{'size KB':>10}{'error':>9}")
+    for model, entry in manifest.items():
+        for variant, info in entry['variants'].items():
+            if not info['file']:
+                continue
+            path = os.path.join(ROOT, 'models', info['file'])
+            runs = [measure(model, path, info['graph_optimization_level'], args.batch) for _ in range(args.runs)]
+            median = {key: statistics.median(r[key] for r in runs) for key in ['load_s', 'batch_s', 'row_s']}
+            status = 'selected' if variant == entry['selected'] else ('' if info['passed'] else 'rejected')
+            print(f"{model:<18}{variant:<12}{median['load_s']:>9.3f}{median['batch_s'] * 1e3:>11.2f}{median['row_s'] * 1e3:>9.3f}"
+                  f"{info['size_bytes'] / 1024:>10.0f}{info['error']:>9.4f}  {status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Cold-start benchmark for the inference import path.
+
+Each measurement runs in a fresh interpreter so nothing is cached between runs:
+
+  * "before" imports the training stack the way ml_pipeline.py used to at module
+    import (sklearn estimators, xgboost, skl2onnx, onnxmltools, matplotlib, seaborn)
+    on top of the runtime module.
+  * "after" imports only what Backend/inference.py needs now.
+
+Both variants then load the data and run one predict_yield + recommend_planting.
+
+    python benchmarks/bench_startup.py [--runs 3] [--field-id 100001]
+
+Run from the repository root; models/ must already contain the exported .onnx files
+(run ml_pipeline.py once first).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TRAINING_IMPORTS = '''
+import matplotlib.pyplot, seaborn, xgboost, skl2onnx, onnxmltools
+import sklearn.ensemble, sklearn.cluster, sklearn.metrics, sklearn.model_selection
+'''
+
+PROBE = '''
+import json, sys, time, logging, warnings
+warnings.filterwarnings('ignore')
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+{extra_imports}
+from ml_pipeline import SoilFusionMLPipeline
+from ml_inference import predict_yield, recommend_planting
+t1 = time.perf_counter()
+logging.getLogger().setLevel(logging.ERROR)
+pipeline = SoilFusionMLPipeline()
+pipeline.load_data()
+pipeline.preprocess_data()
+field_id = {field_id} if {field_id} is not None else int(pipeline.processed_df['field_id'].iloc[0])
+t2 = time.perf_counter()
+predict_yield(field_id, pipeline)
+recommend_planting(field_id, pipeline)
+t3 = time.perf_counter()
+print(json.dumps({{"import_s": t1 - t0, "load_s": t2 - t1, "first_prediction_s": t3 - t2, "total_s": t3 - t0}}))
+'''
+
+
+def run_probe(variant, field_id):
+    code = PROBE.format(
+        root=ROOT,
+        extra_imports=TRAINING_IMPORTS if variant == 'before' else '',
+        field_id=field_id,
+    )
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--field-id', type=int, default=None)
+    args = parser.parse_args()
+
+    summary = {}
+    for variant in ['before', 'after']:
+        samples = [run_probe(variant, args.field_id) for _ in range(args.runs)]
+        summary[variant] = {k: statistics.median(s[k] for s in samples) for k in samples[0]}
+
+    print(f"{'metric':<22}{'before':>10}{'after':>10}{'speedup':>10}")
+    for key in summary['before']:
+        before, after = summary['before'][key], summary['after'][key]
+        print(f"{key:<22}{before:>9.3f}s{after:>9.3f}s{before / after:>9.2f}x")
+    print(json.dumps(summary))
+
+
+if __name__ == '__main__':
+    main()
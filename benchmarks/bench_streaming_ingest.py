@@ -0,0 +1,100 @@
+"""Peak-memory benchmark for streaming ingestion in SoilFusionMLPipeline.load_data.
+
+Writes a raw sub-daily sensor export (wide moisture_percent format by default, or the
+legacy parameter/value format with --legacy) and loads it twice in fresh processes:
+once fully in memory and once with ingest_chunksize. Reports wall time, peak RSS and
+checks the daily frames are identical.
+
+    python benchmarks/bench_streaming_ingest.py [--fields 500] [--days 120] [--readings-per-day 48] [--chunksize 200000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, sys, time, logging
+sys.path.insert(0, {root!r})
+logging.getLogger().setLevel(logging.ERROR)
+from ml_pipeline import SoilFusionMLPipeline
+pipeline = SoilFusionMLPipeline(data_dir={data_dir!r}, model_dir={data_dir!r}, plots_dir={data_dir!r}, ingest_chunksize={chunksize})
+t0 = time.perf_counter()
+df = pipeline.load_data()
+elapsed = time.perf_counter() - t0
+df.to_pickle({out!r})
+print(json.dumps(dict(pipeline.ingest_stats, seconds=elapsed)))
+'''
+
+
+def write_export(data_dir, fields, days, readings_per_day, legacy, seed=42):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2024-01-01')
+    step = pd.Timedelta(days=1) / readings_per_day
+    path = os.path.join(data_dir, 'sensor_readings.csv')
+    weather_path = os.path.join(data_dir, 'weather_data.csv')
+    # Written one day at a time so generating the file doesn't need the memory we are measuring
+    for day in range(days):
+        n = fields * readings_per_day
+        ts = start + pd.Timedelta(days=day) + step * np.tile(np.arange(readings_per_day), fields)
+        fid = np.repeat(np.arange(100001, 100001 + fields), readings_per_day)
+        if legacy:
+            frame = pd.DataFrame({
+                'field_id': np.repeat(fid, 3), 'timestamp': np.repeat(ts, 3),
+                'parameter': np.tile(['moisture', 'ph', 'nitrogen'], n),
+                'value': np.column_stack([rng.normal(25, 5, n), rng.normal(6.5, .5, n), rng.normal(50, 10, n)]).ravel(),
+            })
+            weather = pd.DataFrame({'field_id': fid, 'timestamp': ts, 'rainfall': rng.exponential(5, n),
+                                    'humidity': rng.normal(60, 10, n), 'temperature': rng.normal(25, 5, n)})
+            weather.to_csv(weather_path, mode='a', header=day == 0, index=False)
+        else:
+            frame = pd.DataFrame({
+                'field_id': fid, 'timestamp': ts, 'moisture_percent': rng.normal(25, 5, n),
+                'temperature_c': rng.normal(25, 5, n), 'ph': rng.normal(6.5, .5, n),
+                'nitrogen_ppm': rng.normal(50, 10, n), 'rainfall_mm': rng.exponential(5, n),
+                'humidity_percent': rng.normal(60, 10, n),
+            })
+        frame.to_csv(path, mode='a', header=day == 0, index=False)
+    pd.DataFrame({'field_id': [100001], 'soil_type': ['Loam']}).to_csv(os.path.join(data_dir, 'fields.csv'), index=False)
+    pd.DataFrame({'field_id': [100001], 'crop_id': [300001], 'yield_value': [4000], 'season': ['Kharif'], 'year': [2024]}).to_csv(os.path.join(data_dir, 'yield_history.csv'), index=False)
+    pd.DataFrame({'crop_id': [300001], 'crop_name': ['Wheat'], 'growth_period_days': [120]}).to_csv(os.path.join(data_dir, 'crops.csv'), index=False)
+    return os.path.getsize(path)
+
+
+def run(data_dir, chunksize, out):
+    code = PROBE.format(root=ROOT, data_dir=data_dir, chunksize=chunksize, out=out)
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fields', type=int, default=500)
+    parser.add_argument('--days', type=int, default=120)
+    parser.add_argument('--readings-per-day', type=int, default=48)
+    parser.add_argument('--chunksize', type=int, default=200_000)
+    parser.add_argument('--legacy', action='store_true', help="parameter/value long format + weather_data.csv")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        size = write_export(tmp, args.fields, args.days, args.readings_per_day, args.legacy)
+        print(f"raw export: {size / 1e6:,.0f} MB")
+        full = run(tmp, None, os.path.join(tmp, 'full.pkl'))
+        streamed = run(tmp, args.chunksize, os.path.join(tmp, 'streamed.pkl'))
+        pd.testing.assert_frame_equal(pd.read_pickle(os.path.join(tmp, 'full.pkl')),
+                                      pd.read_pickle(os.path.join(tmp, 'streamed.pkl')), rtol=1e-12)
+
+    print(f"{'mode':<12}{'seconds':>10}{'peak RSS MB':>14}{'field-days':>12}")
+    for name, stats in [('in-memory', full), ('streaming', streamed)]:
+        print(f"{name:<12}{stats['seconds']:>10.2f}{stats['peak_rss_mb']:>14.0f}{stats['field_days']:>12,}")
+    print("daily frames match")
+
+
+if __name__ == '__main__':
+    main()
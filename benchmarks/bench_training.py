@@ -0,0 +1,63 @@
+"""Wall-time benchmark for SoilFusionMLPipeline.train_all.
+
+Trains the yield, anomaly and clustering stages (plus the correlation plot) on a
+synthetic processed frame, once one stage after another on a single core and once
+through the parallel orchestrator, and checks the merged anomaly/cluster columns match.
+
+    python benchmarks/bench_training.py [--fields 500] [--days 365] [--n-jobs 8]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_features import make_raw_df
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_pipeline import SoilFusionMLPipeline, available_cores
+
+
+def train(raw_df, tmp, n_jobs, parallel):
+    pipeline = SoilFusionMLPipeline(data_dir=tmp, model_dir=tmp, plots_dir=tmp, n_jobs=n_jobs)
+    pipeline.raw_df = raw_df
+    pipeline.yield_history = pd.DataFrame(columns=['field_id', 'year', 'season', 'crop_id', 'yield_value'])
+    pipeline.crops = pd.DataFrame({'crop_id': [300001], 'crop_name': ['Wheat'], 'growth_period_days': [120]})
+    pipeline.preprocess_data()
+    t0 = time.perf_counter()
+    pipeline.train_all(parallel=parallel)
+    return pipeline, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fields', type=int, default=500)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--n-jobs', type=int, default=available_cores())
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    raw_df = make_raw_df(args.fields, args.days)
+    print(f"{len(raw_df):,} rows ({args.fields:,} fields x {args.days} days), {args.n_jobs} cores")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sequential, sequential_s = train(raw_df, tmp, 1, parallel=False)
+        parallel, parallel_s = train(raw_df, tmp, args.n_jobs, parallel=True)
+
+    print(f"sequential, 1 core : {sequential_s:8.2f}s")
+    print(f"train_all          : {parallel_s:8.2f}s")
+    print(f"speedup            : {sequential_s / parallel_s:8.1f}x")
+
+    for col in ['anomaly_label', 'anomaly_score', 'soil_cluster']:
+        np.testing.assert_allclose(parallel.processed_df[col].to_numpy(), sequential.processed_df[col].to_numpy(), err_msg=col)
+    assert set(parallel.models) == set(sequential.models), "missing trained models"
+    print("merged columns match")
+
+
+if __name__ == '__main__':
+    main()
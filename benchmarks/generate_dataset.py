@@ -0,0 +1,46 @@
+"""Write a synthetic SoilFusion dataset for load testing.
+
+Wraps SoilFusionMLPipeline.generate_synthetic_data: fields.csv, crops.csv,
+sensor_readings.csv (wide, or legacy parameter/value plus weather_data.csv) and a
+yield_history.csv that joins to every generated field season.
+
+    python benchmarks/generate_dataset.py OUT_DIR [--fields 10000] [--days 730] [--readings-per-day 1] [--legacy] [--seed 42]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_pipeline import SoilFusionMLPipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('out_dir')
+    parser.add_argument('--fields', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--readings-per-day', type=int, default=1)
+    parser.add_argument('--legacy', action='store_true', help="parameter/value long format + weather_data.csv")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    os.makedirs(args.out_dir, exist_ok=True)
+    pipeline = SoilFusionMLPipeline(data_dir=args.out_dir, model_dir=args.out_dir, plots_dir=args.out_dir)
+    t0 = time.perf_counter()
+    pipeline.generate_synthetic_data(
+        num_fields=args.fields, days=args.days, readings_per_day=args.readings_per_day,
+        output_format='legacy' if args.legacy else 'wide', seed=args.seed
+    )
+    elapsed = time.perf_counter() - t0
+
+    for name in sorted(os.listdir(args.out_dir)):
+        if name.endswith('.csv'):
+            print(f"{name:<22}{os.path.getsize(os.path.join(args.out_dir, name)) / 1e6:>10,.1f} MB")
+    print(f"generated in {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
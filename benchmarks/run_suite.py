@@ -0,0 +1,213 @@
+"""End-to-end benchmark suite: ingest, features, training and inference across dataset sizes.
+
+Each size runs in a fresh interpreter on a generated dataset (see generate_dataset.py):
+
+  ingest_files, load_data, preprocess_data, train_yield_prediction,
+  train_anomaly_detection, train_soil_clustering, generate_visualizations (data only),
+  per-field predict_yield / detect_anomaly / recommend_planting (median and p95),
+  recommend_planting_batch over every field,
+  and the cold start of `Backend/inference.py <field_id>` as a new process.
+
+Every stage records wall time and the process's peak RSS so far; each size runs
+--repeats times and the median of each timing is kept. Results are written
+as JSON and compared against benchmarks/baseline.json; stages slower than the baseline
+by more than --tolerance are reported as regressions. --fail-on-regression also fails
+when there is no baseline, so CI can't pass without comparing.
+
+The committed baseline was recorded on the reference machine named in its "meta"
+block (small and medium sizes). Timings only compare on like hardware: on another
+machine, record a local baseline first (--save-baseline --baseline <path>) and compare
+against that. Refresh the committed one, on the reference machine, whenever a change
+is meant to move the numbers.
+
+    python benchmarks/run_suite.py [--sizes small medium] [--output benchmarks/results/latest.json]
+    python benchmarks/run_suite.py --save-baseline          # record benchmarks/baseline.json
+    python benchmarks/run_suite.py --fail-on-regression     # exit 1 on regressions (CI)
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# fields x days at one reading per day
+SIZES = {
+    'small': (100, 180),
+    'medium': (1000, 365),
+    'large': (10000, 730),
+}
+DEFAULT_BASELINE = os.path.join(HERE, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(HERE, 'results', 'latest.json')
+
+
+def run_size(fields, days, lookups):
+    # Runs inside the per-size worker process
+    import logging
+    sys.path.insert(0, ROOT)
+    from ml_pipeline import SoilFusionMLPipeline, peak_rss_mb
+    from ml_inference import predict_yield, detect_anomaly, recommend_planting, recommend_planting_batch
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = {}
+
+    def timed(name, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        out = fn(*args, **kwargs)
+        results[name] = {'seconds': time.perf_counter() - t0, 'peak_rss_mb': peak_rss_mb()}
+        return out
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dirs = {name: os.path.join(tmp, name) for name in ['data', 'models', 'plots']}
+        pipeline = SoilFusionMLPipeline(data_dir=dirs['data'], model_dir=dirs['models'], plots_dir=dirs['plots'], plots='off')
+        pipeline.generate_synthetic_data(num_fields=fields, days=days)
+
+        timed('ingest_files', pipeline.ingest_files)
+        timed('load_data', pipeline.load_data)
+        timed('preprocess_data', pipeline.preprocess_data)
+        timed('train_yield_prediction', pipeline.train_yield_prediction)
+        timed('train_anomaly_detection', pipeline.train_anomaly_detection)
+        timed('train_soil_clustering', pipeline.train_soil_clustering)
+        timed('generate_visualizations', pipeline.generate_visualizations, mode='off')
+
+        field_ids = pipeline.processed_df['field_id'].drop_duplicates().sample(
+            n=min(lookups, fields), random_state=0).astype(int).tolist()
+        for fn in [predict_yield, detect_anomaly, recommend_planting]:
+            fn(field_ids[0], pipeline)  # session load is measured by the cold start below
+            samples = []
+            for field_id in field_ids:
+                t0 = time.perf_counter()
+                fn(field_id, pipeline)
+                samples.append(time.perf_counter() - t0)
+            samples.sort()
+            results[f'{fn.__name__}_per_field'] = {
+                'seconds': statistics.median(samples),
+                'p95_seconds': samples[int(0.95 * (len(samples) - 1))],
+                'peak_rss_mb': peak_rss_mb()
+            }
+        timed('recommend_planting_batch', recommend_planting_batch, 'all', pipeline)
+
+        # Fresh process, as /api/ml/predict does when the inference worker is down
+        t0 = time.perf_counter()
+        out = subprocess.run([sys.executable, os.path.join(ROOT, 'Backend', 'inference.py'), str(field_ids[0])],
+                             cwd=tmp, capture_output=True, text=True)
+        cold = time.perf_counter() - t0
+        if out.returncode != 0:
+            raise RuntimeError(f"inference.py failed: {out.stdout[-500:]}{out.stderr[-500:]}")
+        results['inference_cold_start'] = {'seconds': cold}
+    return results
+
+
+def run_worker(size, fields, days, lookups):
+    # Each size in its own interpreter so peak RSS isn't carried over from a previous size
+    code = f"import json, sys; sys.path.insert(0, {HERE!r}); from run_suite import run_size; print(json.dumps(run_size({fields}, {days}, {lookups})))"
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"{size} failed:\n{out.stderr[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def median_results(runs):
+    # Per stage: the median of each timing over the runs, the largest peak RSS
+    merged = {}
+    for stage, first in runs[0].items():
+        merged[stage] = {key: (max if key == 'peak_rss_mb' else statistics.median)(run[stage][key] for run in runs)
+                         for key in first}
+    return merged
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline, tolerance, min_seconds=0.05):
+    regressions = []
+    for size, stages in results.items():
+        for stage, current in stages.items():
+            previous = baseline.get('results', {}).get(size, {}).get(stage)
+            if not previous:
+                continue
+            slower = current['seconds'] - previous['seconds']
+            ratio = current['seconds'] / previous['seconds'] if previous['seconds'] else float('inf')
+            if ratio > 1 + tolerance and slower > min_seconds:
+                regressions.append((size, stage, previous['seconds'], current['seconds'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=['small', 'medium'], choices=list(SIZES))
+    parser.add_argument('--lookups', type=int, default=50, help="fields sampled for per-field latency")
+    parser.add_argument('--repeats', type=int, default=3, help="runs per size; timings are their median")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="also write the results to --baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeats': args.repeats,
+        },
+        'sizes': {size: {'fields': SIZES[size][0], 'days': SIZES[size][1]} for size in args.sizes},
+        'results': {}
+    }
+    for size in args.sizes:
+        fields, days = SIZES[size]
+        print(f"== {size}: {fields:,} fields x {days} days")
+        report['results'][size] = median_results([run_worker(size, fields, days, args.lookups)
+                                                  for _ in range(args.repeats)])
+        for stage, stats in report['results'][size].items():
+            rss = f"{stats['peak_rss_mb']:>10.0f} MB" if 'peak_rss_mb' in stats else ''
+            print(f"   {stage:<32}{stats['seconds'] * 1e3 if stage.endswith('_per_field') else stats['seconds']:>10.3f}"
+                  f"{' ms' if stage.endswith('_per_field') else ' s '}{rss}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline to compare against at {args.baseline} (run with --save-baseline)")
+        if args.fail_on_regression:
+            sys.exit(1)
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    recorded = baseline.get('meta', {})
+    if (recorded.get('platform'), recorded.get('cpu_count')) != (report['meta']['platform'], report['meta']['cpu_count']):
+        print(f"note: baseline recorded on {recorded.get('platform')} with {recorded.get('cpu_count')} CPUs; "
+              f"this run is {report['meta']['platform']} with {report['meta']['cpu_count']}")
+    regressions = compare(report['results'], baseline, args.tolerance)
+    for size, stage, before, after, ratio in regressions:
+        print(f"REGRESSION {size}/{stage}: {before:.3f}s -> {after:.3f}s ({ratio:.2f}x)")
+    if not regressions:
+        print(f"no regressions vs baseline (tolerance {args.tolerance:.0%})")
+    elif args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+# test_pipeline.py is a manual smoke script that trains on ./data at import time, and the
+# benchmarks are scripts too; pytest collects only the test_*.py modules below
+collect_ignore = ['test_pipeline.py', 'benchmarks']
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+
+# Result cache for per-field analyses, shared by the inference worker and one-shot CLI runs
+# through a small SQLite file. Callers key entries with a version that changes on every
+# upload or retrain, so old entries stop matching; they are purged on the next write.
+# Least recently used entries are evicted past max_entries, and entries expire after ttl
+# seconds. Imports only the standard library, so a hit never loads pandas or onnxruntime.
+
+def directory_signature(directory, include=None):
+    # Cheap stat-only fingerprint of the files in a directory
+    if not os.path.isdir(directory):
+        return ()
+    signature = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if (include is None or include(name)) and os.path.isfile(path):
+            st = os.stat(path)
+            signature.append((name, st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+class ResultCache:
+    STATS = ['hits', 'misses', 'expired', 'evictions', 'invalidations']
+
+    def __init__(self, path, max_entries=10000, ttl=3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = None
+        self._version = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, version TEXT, value TEXT, created REAL, accessed REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+            self._conn = conn
+        return self._conn
+
+    def _bump(self, conn, name, count=1):
+        if count:
+            conn.execute("INSERT INTO stats (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, count))
+
+    def get(self, key):
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute("SELECT value, created FROM results WHERE key = ?", (key,)).fetchone()
+                with conn:
+                    if row is not None and now - row[1] > self.ttl:
+                        conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                        self._bump(conn, 'expired')
+                        row = None
+                    if row is None:
+                        self._bump(conn, 'misses')
+                        return None
+                    conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+                    self._bump(conn, 'hits')
+            return json.loads(row[0])
+        except sqlite3.Error as e:
+            # The cache must never fail a request
+            logging.warning(f"Result cache unavailable: {e}")
+            return None
+
+    def put(self, key, value, version):
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", (key, version, json.dumps(value), now, now))
+                    if version != self._version:
+                        # First write since an upload or retrain (or since this process started)
+                        self._bump(conn, 'invalidations', conn.execute("DELETE FROM results WHERE version != ?", (version,)).rowcount)
+                        self._version = version
+                    conn.execute("DELETE FROM results WHERE created < ?", (now - self.ttl,))
+                    overflow = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+                    if overflow > 0:
+                        conn.execute("DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY accessed LIMIT ?)", (overflow,))
+                        self._bump(conn, 'evictions', overflow)
+        except sqlite3.Error as e:
+            logging.warning(f"Result cache unavailable: {e}")
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM results")
+
+    def stats(self):
+        try:
+            with self._lock:
+                conn = self._connect()
+                counts = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+                entries = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        except sqlite3.Error as e:
+            return {'error': str(e)}
+        stats = {name: counts.get(name, 0) for name in self.STATS}
+        lookups = stats['hits'] + stats['misses']
+        stats.update(entries=entries, max_entries=self.max_entries, ttl=self.ttl,
+                     hit_rate=stats['hits'] / lookups if lookups else None)
+        return stats
+
+    def prometheus(self, prefix='soilfusion'):
+        stats = self.stats()
+        if 'error' in stats:
+            return ""
+        lines = []
+        for name in self.STATS:
+            lines.append(f"# TYPE {prefix}_result_cache_{name}_total counter")
+            lines.append(f"{prefix}_result_cache_{name}_total {stats[name]}")
+        lines.append(f"# TYPE {prefix}_result_cache_entries gauge")
+        lines.append(f"{prefix}_result_cache_entries {stats['entries']}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,471 @@
+import pandas as pd
+import numpy as np
+import os
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+import onnxruntime as rt
+from ml_manifest import UnknownFieldError
+from ml_metrics import instrumented, recorder
+
+# Runtime half of the pipeline: everything the inference path needs, without the
+# training stack (sklearn estimators, xgboost, skl2onnx, matplotlib, seaborn).
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    'disable': rt.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': rt.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': rt.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': rt.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+EXECUTION_MODES = {
+    'sequential': rt.ExecutionMode.ORT_SEQUENTIAL,
+    'parallel': rt.ExecutionMode.ORT_PARALLEL,
+}
+
+class SessionRegistry:
+    # Process-wide cache of ONNX sessions keyed by model path + mtime/size. A changed
+    # file is loaded off to the side and swapped in under the lock; identical bytes
+    # (same SHA-256) keep the existing session.
+
+    def __init__(self, intra_op_num_threads=0, inter_op_num_threads=0,
+                 graph_optimization_level='all', execution_mode='sequential'):
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.options = {}
+        self.configure(
+            intra_op_num_threads=intra_op_num_threads,
+            inter_op_num_threads=inter_op_num_threads,
+            graph_optimization_level=graph_optimization_level,
+            execution_mode=execution_mode
+        )
+
+    def configure(self, **options):
+        unknown = set(options) - {'intra_op_num_threads', 'inter_op_num_threads', 'graph_optimization_level', 'execution_mode'}
+        if unknown:
+            raise ValueError(f"Unknown session options: {sorted(unknown)}")
+        if options.get('graph_optimization_level', 'all') not in GRAPH_OPTIMIZATION_LEVELS:
+            raise ValueError(f"graph_optimization_level must be one of {list(GRAPH_OPTIMIZATION_LEVELS)}")
+        if options.get('execution_mode', 'sequential') not in EXECUTION_MODES:
+            raise ValueError(f"execution_mode must be one of {list(EXECUTION_MODES)}")
+        with self._lock:
+            self.options.update(options)
+            # Existing sessions were built with the old options
+            self._sessions.clear()
+
+    def session_options(self, graph_optimization_level=None):
+        so = rt.SessionOptions()
+        so.intra_op_num_threads = int(self.options['intra_op_num_threads'])
+        so.inter_op_num_threads = int(self.options['inter_op_num_threads'])
+        so.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[graph_optimization_level or self.options['graph_optimization_level']]
+        so.execution_mode = EXECUTION_MODES[self.options['execution_mode']]
+        return so
+
+    def get(self, model_path, graph_optimization_level=None):
+        # graph_optimization_level overrides the configured level, e.g. 'disable' for
+        # variants that were already optimized offline
+        model_path = os.path.abspath(model_path)
+        st = os.stat(model_path)
+        stamp = (st.st_mtime_ns, st.st_size, graph_optimization_level)
+        entry = self._sessions.get(model_path)
+        if entry is not None and entry['stamp'] == stamp:
+            return entry['session']
+
+        with self._lock:
+            entry = self._sessions.get(model_path)
+            if entry is not None and entry['stamp'] == stamp:
+                return entry['session']
+            with open(model_path, 'rb') as f:
+                model_bytes = f.read()
+            digest = hashlib.sha256(model_bytes).hexdigest()
+            if entry is not None and entry['sha256'] == digest and entry['stamp'][2] == graph_optimization_level:
+                entry['stamp'] = stamp
+                return entry['session']
+            with recorder.span(f"load_session:{os.path.basename(model_path)}"):
+                session = rt.InferenceSession(model_bytes, sess_options=self.session_options(graph_optimization_level))
+            if entry is not None:
+                logging.info(f"Reloaded ONNX model {os.path.basename(model_path)} after it changed on disk.")
+            self._sessions[model_path] = {'stamp': stamp, 'sha256': digest, 'session': session}
+            return session
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self):
+        return {
+            os.path.basename(path): {'sha256': entry['sha256'][:12], 'mtime_ns': entry['stamp'][0]}
+            for path, entry in list(self._sessions.items())
+        }
+
+sessions = SessionRegistry(
+    intra_op_num_threads=int(os.environ.get('ORT_INTRA_OP_THREADS', 0)),
+    inter_op_num_threads=int(os.environ.get('ORT_INTER_OP_THREADS', 0)),
+    graph_optimization_level=os.environ.get('ORT_GRAPH_OPT_LEVEL', 'all'),
+    execution_mode=os.environ.get('ORT_EXECUTION_MODE', 'sequential')
+)
+
+def get_session(model_path):
+    return sessions.get(model_path)
+
+def configure_sessions(**options):
+    sessions.configure(**options)
+
+# Variants written by SoilFusionMLPipeline.export_onnx_variants. 'auto' loads the one it
+# selected; 'base' or the name of a variant the release kept forces one.
+ONNX_VARIANTS_FILE = 'onnx_variants.json'
+ONNX_VARIANT = os.environ.get('SOILFUSION_ONNX_VARIANT', 'auto')
+_variant_manifests = {}
+
+def variant_manifest(model_dir):
+    path = os.path.join(model_dir, ONNX_VARIANTS_FILE)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return {}
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _variant_manifests.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with open(path) as f:
+        manifest = json.load(f)
+    _variant_manifests[path] = (stamp, manifest)
+    return manifest
+
+def resolve_model(model_dir, name, variant=None):
+    # (path, graph_optimization_level) to load for model `name`. The base export is used when
+    # there are no variants, the requested one failed validation, or the base model was
+    # retrained after the variants were made.
+    base_path = os.path.join(model_dir, f'{name}.onnx')
+    variant = variant or ONNX_VARIANT
+    entry = variant_manifest(model_dir).get(name)
+    if entry is None or variant == 'base':
+        return base_path, None
+    st = os.stat(base_path)
+    if [st.st_mtime_ns, st.st_size] != entry['source']:
+        return base_path, None
+    chosen = entry['variants'].get(entry['selected'] if variant == 'auto' else variant)
+    if chosen is None or not chosen['passed'] or not chosen.get('file'):
+        return base_path, None
+    return os.path.join(model_dir, chosen['file']), chosen['graph_optimization_level']
+
+def model_session(pipeline, name):
+    path, level = resolve_model(pipeline.model_dir, name)
+    return sessions.get(path, graph_optimization_level=level)
+
+class FieldIndex:
+    # field_id -> contiguous row range of a field-sorted processed_df, built once so
+    # per-field lookups are slices instead of a boolean scan of the whole frame.
+
+    def __init__(self, df):
+        self.source = df
+        field_ids = df['field_id'].to_numpy()
+        if len(field_ids) > 1 and (field_ids[1:] < field_ids[:-1]).any():
+            # Stable, so rows within a field keep their order (same as df[df.field_id == id])
+            df = df.sort_values('field_id', kind='stable')
+            field_ids = df['field_id'].to_numpy()
+        self.df = df
+        starts = np.flatnonzero(np.r_[True, field_ids[1:] != field_ids[:-1]]) if len(field_ids) else np.array([], dtype=int)
+        stops = np.r_[starts[1:], len(field_ids)].astype(int)
+        self.field_ids = field_ids[starts]
+        self.starts, self.stops = starts.astype(int), stops
+        self._spans = dict(zip(self.field_ids.tolist(), zip(starts.tolist(), stops.tolist())))
+        # Latest row per field, indexed by field_id
+        self.latest = df.iloc[stops - 1]
+        self.latest.index = self.field_ids
+
+    def __contains__(self, field_id):
+        return int(field_id) in self._spans
+
+    def __len__(self):
+        return len(self._spans)
+
+    def rows(self, field_id):
+        start, stop = self._spans.get(int(field_id), (0, 0))
+        return self.df.iloc[start:stop]
+
+    def last(self, field_id):
+        if field_id not in self:
+            raise UnknownFieldError([field_id])
+        stop = self._spans[int(field_id)][1]
+        return self.df.iloc[[stop - 1]]
+
+    def tail(self, field_id, n):
+        start, stop = self._spans.get(int(field_id), (0, 0))
+        return self.df.iloc[max(start, stop - n):stop]
+
+    def positions(self, field_ids):
+        # Positions in self.field_ids of the requested fields ("all": every field, in index order)
+        if isinstance(field_ids, str) and field_ids == 'all':
+            return np.arange(len(self.field_ids))
+        field_ids = [int(f) for f in field_ids]
+        pos = pd.Index(self.field_ids).get_indexer(field_ids)
+        if (pos < 0).any():
+            raise UnknownFieldError([f for f, p in zip(field_ids, pos) if p < 0])
+        return pos
+
+    def tail_means(self, field_ids, columns, n):
+        # Mean of each column over the last n rows of every requested field, in one gather.
+        # Equal to tail(field_id, n)[column].mean() to the bit: pandas sums those rows in the
+        # column's dtype, in order, skipping NaNs, and divides by the count; so does this.
+        # (A groupby mean sums with compensation and can differ in the last bit.)
+        pos = self.positions(field_ids)
+        starts, stops = self.starts[pos], self.stops[pos]
+        rows = stops[:, None] - n + np.arange(n)
+        in_tail = rows >= starts[:, None]
+        rows = np.where(in_tail, rows, 0)
+        means = {}
+        for column in columns:
+            values = self.df[column].to_numpy()[rows]
+            valid = in_tail & ~np.isnan(values)
+            sums = np.where(valid, values, 0).sum(axis=1, dtype=values.dtype)
+            counts = valid.sum(axis=1).astype(values.dtype)
+            with np.errstate(all='ignore'):
+                means[column] = np.where(counts > 0, sums / counts, np.nan)
+        return pd.DataFrame(means, index=self.field_ids[pos])
+
+def field_index(pipeline):
+    # Rebuilt lazily whenever processed_df is replaced (e.g. after training adds columns)
+    index = getattr(pipeline, 'field_index', None)
+    if index is None or index.source is not pipeline.processed_df:
+        index = FieldIndex(pipeline.processed_df)
+        pipeline.field_index = index
+    return index
+
+def get_soil_health_score(moisture, ph, nitrogen, is_anomalous):
+    m_score = 30 if 20 <= moisture <= 40 else (15 if (10<=moisture<20 or 40<moisture<=50) else 0)
+    ph_diff = abs(ph - 6.5)
+    ph_score = 30 if ph_diff <= 0.5 else (15 if ph_diff <= 1.5 else 0)
+    n_score = 30 if nitrogen >= 50 else (15 if 20 <= nitrogen < 50 else 0)
+    penalty = 20 if is_anomalous else 0
+    
+    total_score = m_score + ph_score + n_score - penalty
+    total_score = max(0, min(100, total_score))
+    
+    risk_level = "Low" if total_score >= 80 else ("Medium" if total_score >= 50 else "High")
+    return total_score, risk_level
+
+def get_soil_health_score_batch(moisture, ph, nitrogen, is_anomalous):
+    # get_soil_health_score over arrays: scores and risk levels for many fields at once
+    moisture, ph, nitrogen = np.asarray(moisture), np.asarray(ph), np.asarray(nitrogen)
+    m_score = np.select([(20 <= moisture) & (moisture <= 40),
+                         ((10 <= moisture) & (moisture < 20)) | ((40 < moisture) & (moisture <= 50))], [30, 15], 0)
+    ph_diff = np.abs(ph - 6.5)
+    ph_score = np.select([ph_diff <= 0.5, ph_diff <= 1.5], [30, 15], 0)
+    n_score = np.select([nitrogen >= 50, (20 <= nitrogen) & (nitrogen < 50)], [30, 15], 0)
+    penalty = np.where(is_anomalous, 20, 0)
+
+    total_score = np.clip(m_score + ph_score + n_score - penalty, 0, 100)
+    risk_level = np.select([total_score >= 80, total_score >= 50], ["Low", "Medium"], "High")
+    return total_score, risk_level
+
+def _encode_soil_types(soil_types, pipeline):
+    enc = pipeline.encoders.get('soil_type')
+    codes, encoded = {}, []
+    for soil_type in soil_types:
+        if soil_type not in codes:
+            # Unseen labels, and inference-only pipelines without a fitted encoder, map to 0
+            try:
+                codes[soil_type] = enc.transform([soil_type])[0] if enc is not None else 0
+            except (ValueError, KeyError):
+                codes[soil_type] = 0
+        encoded.append(codes[soil_type])
+    return encoded
+
+def _yield_inputs(rows, pipeline):
+    # One float32 row per entry in `rows`, in the column order the yield model was exported with
+    X_input = pd.DataFrame({
+        'avg_moisture': rows['roll_mean_moisture'].values,
+        'avg_ph': rows['roll_mean_ph'].values,
+        'avg_nitrogen': rows['roll_mean_nitrogen'].values,
+        'avg_temperature': rows['temperature'].values,
+        'rainfall': rows['rainfall'].values,
+        'humidity': rows['humidity'].values,
+        'soil_type_encoded': _encode_soil_types(list(rows['soil_type']), pipeline),
+        'crop_id': pipeline.crops['crop_id'].iloc[0],
+        'roll_mean_moisture': rows['roll_mean_moisture'].values,
+        'roll_mean_ph': rows['roll_mean_ph'].values,
+        'roll_mean_nitrogen': rows['roll_mean_nitrogen'].values,
+        'stability_score': rows['stability_score'].values
+    })
+    return X_input.values.astype(np.float32)
+
+def _anomaly_inputs(rows):
+    return rows[['moisture', 'ph', 'nitrogen', 'temperature', 'rainfall']].values.astype(np.float32)
+
+@instrumented(rows=lambda *a, **k: 1)
+def predict_yield(field_id, pipeline):
+    sess = model_session(pipeline, 'yield_model')
+    input_name = sess.get_inputs()[0].name
+    field_data = field_index(pipeline).last(field_id)
+    
+    input_data = _yield_inputs(field_data, pipeline)
+    prediction = sess.run(None, {input_name: input_data})[0][0][0]
+    return float(prediction)
+
+@instrumented(rows=lambda *a, **k: 1)
+def detect_anomaly(field_id, pipeline):
+    sess = model_session(pipeline, 'anomaly_model')
+    input_name = sess.get_inputs()[0].name
+    field_data = field_index(pipeline).last(field_id)
+    
+    input_data = _anomaly_inputs(field_data)
+    pred_label = sess.run(None, {input_name: input_data})[0][0]
+    is_anomaly = (pred_label == -1)
+    if is_anomaly:
+        logging.warning(f"ALERT: Abnormal Soil Trends Detected on {field_id}!")
+        
+    return is_anomaly
+
+@instrumented(rows=lambda *a, **k: 1)
+def recommend_planting(field_id, pipeline):
+    history = field_index(pipeline).tail(field_id, 7)
+    
+    avg_m = history['moisture'].mean()
+    avg_ph = history['ph'].mean()
+    avg_n = history['nitrogen'].mean()
+    
+    anomalous = detect_anomaly(field_id, pipeline)
+    score, risk = get_soil_health_score(avg_m, avg_ph, avg_n, anomalous)
+    
+    moisture_ok = 15 <= avg_m <= 40
+    ph_ok = 5.5 <= avg_ph <= 7.5
+    nitrogen_ok = avg_n >= 30
+    
+    stability = history['stability_score'].mean()
+    confidence = (score * 0.4) + (stability * 10 * 0.4) + (20 if not anomalous else 0)
+    confidence = min(100, max(0, confidence))
+    
+    if moisture_ok and ph_ok and nitrogen_ok and not anomalous:
+        status = "Optimal to Plant"
+        crop = pipeline.crops['crop_name'].iloc[0]
+        date = (datetime.now() + timedelta(days=2)).strftime('%Y-%m-%d')
+    else:
+        status = "Warning - Delay Planting"
+        crop = "Treat Soil First"
+        date = "N/A"
+        
+    return {
+        "Field_ID": field_id,
+        "Status": status,
+        "Confidence_Score": f"{confidence:.2f}%",
+        "Target_Crop": crop,
+        "Recommended_Start_Date": date,
+        "Soil_Health_Risk": risk
+    }
+
+@instrumented(rows=lambda result, *a, **k: len(result))
+def latest_field_rows(field_ids, pipeline):
+    # Latest processed row per field, in the order requested. field_ids may be "all".
+    latest = field_index(pipeline).latest
+    if isinstance(field_ids, str) and field_ids == 'all':
+        return latest
+    field_ids = [int(f) for f in field_ids]
+    missing = [f for f in field_ids if f not in latest.index]
+    if missing:
+        raise UnknownFieldError(missing)
+    return latest.loc[field_ids]
+
+@instrumented(rows=lambda result, *a, **k: len(result))
+def predict_yield_batch(field_ids, pipeline, rows=None):
+    rows = latest_field_rows(field_ids, pipeline) if rows is None else rows
+    sess = model_session(pipeline, 'yield_model')
+    input_name = sess.get_inputs()[0].name
+    predictions = sess.run(None, {input_name: _yield_inputs(rows, pipeline)})[0]
+    return pd.Series(predictions[:, 0].astype(float), index=rows.index, name='yield_prediction_kg_per_ha')
+
+@instrumented(rows=lambda result, *a, **k: len(result))
+def detect_anomaly_batch(field_ids, pipeline, rows=None):
+    rows = latest_field_rows(field_ids, pipeline) if rows is None else rows
+    sess = model_session(pipeline, 'anomaly_model')
+    input_name = sess.get_inputs()[0].name
+    labels, scores = sess.run(None, {input_name: _anomaly_inputs(rows)})[:2]
+    result = pd.DataFrame({
+        'anomaly_detected': labels.ravel() == -1,
+        'anomaly_score': scores.ravel().astype(float)
+    }, index=rows.index)
+    flagged = int(result['anomaly_detected'].sum())
+    if flagged:
+        logging.warning(f"ALERT: Abnormal Soil Trends Detected on {flagged} of {len(result)} fields!")
+    return result
+
+@instrumented(rows=lambda result, *a, **k: len(result))
+def assign_soil_cluster_batch(field_ids, pipeline, rows=None):
+    rows = latest_field_rows(field_ids, pipeline) if rows is None else rows
+    sess = model_session(pipeline, 'clustering_model')
+    input_name = sess.get_inputs()[0].name
+    labels = sess.run(None, {input_name: _anomaly_inputs(rows)})[0]
+    return pd.Series(labels.ravel().astype(int), index=rows.index, name='soil_cluster')
+
+def assess_planting_batch(field_ids, pipeline, anomalies=None):
+    # recommend_planting's numbers for many fields: health score and risk from the last 7
+    # days, confidence, and whether planting is advised. `anomalies` (one flag per field, in
+    # field_ids order) saves the anomaly run when the caller already has it. Unknown ids
+    # raise UnknownFieldError before any model runs.
+    index = field_index(pipeline)
+    history = index.tail_means(field_ids, ['moisture', 'ph', 'nitrogen', 'stability_score'], 7)
+    if anomalies is None:
+        anomalies = detect_anomaly_batch(field_ids, pipeline)['anomaly_detected']
+    anomalous = np.asarray(anomalies, dtype=bool)
+
+    avg_m, avg_ph, avg_n = (history[c].to_numpy() for c in ['moisture', 'ph', 'nitrogen'])
+    score, risk = get_soil_health_score_batch(avg_m, avg_ph, avg_n, anomalous)
+    stability = history['stability_score'].to_numpy()
+    # Promoted like the scalar expression, where score and the bonus are Python numbers
+    confidence = ((score * 0.4).astype(stability.dtype) + (stability * 10 * 0.4)
+                  + np.where(anomalous, 0, 20).astype(stability.dtype))
+    confidence = np.clip(confidence, 0, 100)
+
+    optimal = ((15 <= avg_m) & (avg_m <= 40) & (5.5 <= avg_ph) & (avg_ph <= 7.5) & (avg_n >= 30) & ~anomalous)
+    return pd.DataFrame({
+        'soil_health_score': score,
+        'soil_health_risk': risk,
+        'planting_confidence': confidence,
+        'optimal_to_plant': optimal
+    }, index=history.index)
+
+@instrumented(rows=lambda result, *a, **k: len(result))
+def recommend_planting_batch(field_ids, pipeline, anomalies=None):
+    # recommend_planting for many fields in one pass; row i equals recommend_planting(field_ids[i])
+    assessment = assess_planting_batch(field_ids, pipeline, anomalies)
+    optimal = assessment['optimal_to_plant'].to_numpy()
+    crop = pipeline.crops['crop_name'].iloc[0]
+    date = (datetime.now() + timedelta(days=2)).strftime('%Y-%m-%d')
+    return pd.DataFrame({
+        "Field_ID": assessment.index,
+        "Status": np.where(optimal, "Optimal to Plant", "Warning - Delay Planting"),
+        "Confidence_Score": [f"{c:.2f}%" for c in assessment['planting_confidence'].tolist()],
+        "Target_Crop": np.where(optimal, crop, "Treat Soil First"),
+        "Recommended_Start_Date": np.where(optimal, date, "N/A"),
+        "Soil_Health_Risk": assessment['soil_health_risk'].to_numpy()
+    })
+
+@instrumented(rows=lambda result, *a, **k: len(result))
+def score_fields(field_ids, pipeline):
+    # Yield, anomaly, cluster and planting scoring for many fields: one sess.run per model.
+    # Unknown ids don't fail the batch: they follow the scored fields, each with an "error".
+    missing = []
+    if not (isinstance(field_ids, str) and field_ids == 'all'):
+        index = field_index(pipeline)
+        missing = [int(f) for f in field_ids if f not in index]
+        field_ids = [int(f) for f in field_ids if f in index]
+    errors = pd.DataFrame({'field_id': missing, 'error': [str(UnknownFieldError([f])) for f in missing]})
+    if not len(field_ids) and missing:
+        return errors
+    rows = latest_field_rows(field_ids, pipeline)
+    result = pd.DataFrame({'field_id': rows['field_id'].astype(int)}, index=rows.index)
+    result['yield_prediction_kg_per_ha'] = predict_yield_batch(field_ids, pipeline, rows=rows)
+    result = result.join(detect_anomaly_batch(field_ids, pipeline, rows=rows))
+    if os.path.exists(os.path.join(pipeline.model_dir, 'clustering_model.onnx')):
+        # Clustering is skipped at training time on very small datasets
+        result['soil_cluster'] = assign_soil_cluster_batch(field_ids, pipeline, rows=rows)
+    assessment = assess_planting_batch(field_ids, pipeline, anomalies=result['anomaly_detected'])
+    for column in ['soil_health_score', 'soil_health_risk', 'planting_confidence']:
+        result[column] = assessment[column].to_numpy()
+    result['planting_status'] = np.where(assessment['optimal_to_plant'], "Optimal to Plant", "Warning - Delay Planting")
+    result = result.reset_index(drop=True)
+    if not missing:
+        return result
+    # object columns, so the scored rows keep their ints and bools next to the gaps
+    return pd.concat([result.astype(object), errors], ignore_index=True)
@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import signal
+import logging
+import threading
+import subprocess
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Training runs publish into releases: each run writes its models into a fresh directory
+# under <model_dir>.releases/ and then points the <model_dir> symlink at it with one
+# os.replace, so inference sees either the old set of models or the new one, never a mix.
+# A failed or cancelled run leaves the served models untouched.
+
+KEEP_RELEASES = 2
+
+def new_release_id():
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+def releases_dir(model_dir):
+    return f"{os.path.normpath(model_dir)}.releases"
+
+def release_dir(model_dir, release_id):
+    return os.path.join(releases_dir(model_dir), release_id)
+
+@contextmanager
+def training_lock(model_dir):
+    # One training run per model_dir across processes (worker jobs, CLI runs)
+    with open(f"{os.path.normpath(model_dir)}.lock", 'w') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def publish_release(staging, model_dir):
+    model_dir = os.path.normpath(model_dir)
+    releases = releases_dir(model_dir)
+    os.makedirs(releases, exist_ok=True)
+    if os.path.isdir(model_dir) and not os.path.islink(model_dir):
+        # First publish over a plain directory: keep it as a release. A directory can't be
+        # replaced by a symlink in one rename, so model_dir is briefly missing here, once.
+        os.rename(model_dir, os.path.join(releases, f"initial-{new_release_id()}"))
+    link = f"{model_dir}.tmp-link-{os.getpid()}"
+    os.symlink(os.path.relpath(staging, os.path.dirname(os.path.abspath(model_dir))), link)
+    os.replace(link, model_dir)
+    logging.info(f"Published models from {staging}.")
+
+    # Keep the new release and the one before it (a reader may still be loading from it)
+    current = os.path.basename(os.path.normpath(staging))
+    others = sorted((name for name in os.listdir(releases) if name != current),
+                    key=lambda name: os.path.getmtime(os.path.join(releases, name)), reverse=True)
+    for name in others[KEEP_RELEASES - 1:]:
+        shutil.rmtree(os.path.join(releases, name), ignore_errors=True)
+
+def discard_release(model_dir, release_id):
+    path = release_dir(model_dir, release_id)
+    if os.path.realpath(path) != os.path.realpath(model_dir):
+        shutil.rmtree(path, ignore_errors=True)
+
+class TrainingJobs:
+    """Single-flight ml_pipeline.py runs with status, progress and cancellation.
+
+    One run at a time. A request that arrives while a run is in progress queues one
+    follow-up run, since it may carry data uploaded after the running one read its
+    inputs; any further requests join that queued run. Runs are 'full' (retrain) or
+    'incremental' (apply appended readings); a queued run becomes full if any request
+    joining it asks for that.
+    """
+
+    FINISHED = ('succeeded', 'failed', 'cancelled')
+    MODES = ('full', 'incremental')
+
+    def __init__(self, root, model_dir='models', python=None, history=20):
+        self.root = root
+        self.model_dir = model_dir
+        self.python = python or sys.executable
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._history = deque(maxlen=history)
+        self._running = None
+        self._queued = None
+        self._process = None
+
+    def submit(self, mode='full'):
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of {self.MODES}")
+        with self._lock:
+            if self._queued is not None:
+                self._queued['requests'] += 1
+                if mode == 'full':
+                    self._queued['mode'] = 'full'
+                return dict(self._queued)
+            job = {
+                'id': new_release_id(), 'mode': mode, 'state': 'queued', 'requests': 1,
+                'requested_at': time.time(), 'started_at': None, 'finished_at': None,
+                'progress': None, 'error': None, 'output': []
+            }
+            self._jobs[job['id']] = job
+            if len(self._history) == self._history.maxlen:
+                self._jobs.pop(self._history[0], None)
+            self._history.append(job['id'])
+            if self._running is None:
+                self._start(job)
+            else:
+                self._queued = job
+            return dict(job)
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list(self):
+        with self._lock:
+            return {
+                'running': self._running['id'] if self._running else None,
+                'queued': self._queued['id'] if self._queued else None,
+                'jobs': [dict(self._jobs[job_id]) for job_id in reversed(self._history) if job_id in self._jobs]
+            }
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['state'] in self.FINISHED:
+                return dict(job) if job is not None else None
+            if job is self._queued:
+                self._queued = None
+                self._finish(job, 'cancelled')
+            else:
+                job['cancel_requested'] = True
+                self._terminate()
+            return dict(job)
+
+    def _start(self, job):
+        # Called with the lock held
+        self._running = job
+        job['state'] = 'running'
+        job['started_at'] = time.time()
+        try:
+            command = [self.python, os.path.join(self.root, 'ml_pipeline.py'), '--release-id', job['id'], '--progress']
+            if job['mode'] == 'incremental':
+                command.append('--incremental')
+            self._process = subprocess.Popen(
+                command,
+                cwd=self.root, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True, bufsize=1, start_new_session=True
+            )
+        except OSError as e:
+            job['error'] = str(e)
+            self._finish(job, 'failed')
+            self._running = None
+            return
+        threading.Thread(target=self._watch, args=(job, self._process), daemon=True).start()
+
+    def _terminate(self):
+        # The whole process group: train_all's pool workers too
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(self._process.pid, signal.SIGTERM)
+            else:
+                self._process.terminate()
+        except ProcessLookupError:
+            pass
+
+    def _watch(self, job, process):
+        output = deque(maxlen=50)
+        for line in process.stdout:
+            if line.startswith('{"progress"'):
+                try:
+                    job['progress'] = json.loads(line)['progress']
+                    continue
+                except ValueError:
+                    pass
+            output.append(line.rstrip())
+        code = process.wait()
+        with self._lock:
+            job['output'] = list(output)
+            if code == 0:
+                # Includes a cancel that arrived after the release was published
+                self._finish(job, 'succeeded')
+            elif job.get('cancel_requested'):
+                discard_release(os.path.join(self.root, self.model_dir), job['id'])
+                self._finish(job, 'cancelled')
+            else:
+                discard_release(os.path.join(self.root, self.model_dir), job['id'])
+                job['error'] = f"ml_pipeline.py exited with code {code}"
+                self._finish(job, 'failed')
+            self._running = self._process = None
+            if self._queued is not None:
+                queued, self._queued = self._queued, None
+                self._start(queued)
+
+    def _finish(self, job, state):
+        job['state'] = state
+        job['finished_at'] = time.time()
+        logging.info(f"Training job {job['id']} {state}.")
@@ -0,0 +1,77 @@
+import os
+import json
+import threading
+
+# Field manifest (data/field_manifest.json): one entry per field of the sensor table with
+# its farmer name, soil type, row count, first and last reading date and first and last
+# row offset in the table, plus the size and mtime of the source files it was built from.
+# The pipeline rewrites it only when those files change; the API and inference read it to
+# list fields and validate field ids without scanning the raw data. Imports only the
+# standard library, so reading it never loads pandas.
+
+MANIFEST_FILE = 'field_manifest.json'
+MANIFEST_SOURCES = ['sensor_readings.parquet', 'sensor_readings.csv', 'fields.parquet', 'fields.csv']
+MANIFEST_COLUMNS = ['field_id', 'farmer_name', 'soil_type', 'rows', 'first_date', 'last_date', 'first_row', 'last_row']
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+class UnknownFieldError(ValueError):
+    # A requested field id has no rows; the API answers it with 404 rather than 500
+    def __init__(self, field_ids):
+        self.field_ids = list(field_ids)
+        if len(self.field_ids) == 1:
+            super().__init__(f"No record found for Field ID {self.field_ids[0]}.")
+        else:
+            super().__init__(f"No record found for Field ID(s) {self.field_ids}.")
+
+def source_signature(data_dir):
+    # mtime_ns as a string: JSON readers without 64-bit ints (server.js) compare it exactly
+    signature = {}
+    for name in MANIFEST_SOURCES:
+        path = os.path.join(data_dir, name)
+        if os.path.isfile(path):
+            st = os.stat(path)
+            signature[name] = {'size': st.st_size, 'mtime_ns': str(st.st_mtime_ns)}
+    return signature
+
+def read_manifest(data_dir):
+    # The manifest, or None when it is missing, unreadable or older than its sources
+    try:
+        with open(os.path.join(data_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('source') == source_signature(data_dir) else None
+
+def write_manifest(data_dir, fields, table_rows, source):
+    # source: source_signature() of the files the entries were built from
+    path = os.path.join(data_dir, MANIFEST_FILE)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'source': source, 'table_rows': table_rows, 'columns': MANIFEST_COLUMNS, 'fields': fields}, f)
+    os.replace(tmp_path, path)
+
+def field_entries(data_dir):
+    # {field_id: entry} from a current manifest, cached until the manifest file changes;
+    # None when there is no current manifest
+    path = os.path.join(data_dir, MANIFEST_FILE)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        cached = _cache.get(path)
+    if cached is not None and cached[0] == key:
+        manifest, entries = cached[1], cached[2]
+        if manifest['source'] != source_signature(data_dir):
+            return None
+        return entries
+    manifest = read_manifest(data_dir)
+    if manifest is None:
+        return None
+    entries = {int(entry['field_id']): entry for entry in manifest['fields']}
+    with _cache_lock:
+        _cache[path] = (key, manifest, entries)
+    return entries
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import threading
+import functools
+from collections import deque
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Lightweight spans for pipeline stages and inference calls: wall time, CPU time, rows and
+# the process's peak RSS. Off by default (SOILFUSION_METRICS=1 turns it on process-wide);
+# `with recorder.collect() as spans:` records just the calls made on the current thread.
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 * 1024 if os.uname().sysname == 'Darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+class Recorder:
+    def __init__(self, enabled=False, max_spans=10000):
+        self.enabled = enabled
+        self.spans = deque(maxlen=max_spans)
+        self.totals = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def active(self):
+        return self.enabled or bool(getattr(self._local, 'collectors', None))
+
+    def span(self, name, rows=None):
+        return _Span(self, name, rows)
+
+    def collect(self):
+        return _Collector(self)
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def add(self, span):
+        for collector in getattr(self._local, 'collectors', None) or []:
+            collector.append(span)
+        if not self.enabled:
+            return
+        with self._lock:
+            self.spans.append(span)
+            total = self.totals.setdefault(span['name'], {'count': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'rows': 0, 'errors': 0})
+            total['count'] += 1
+            total['wall_s'] += span['wall_s']
+            total['cpu_s'] += span['cpu_s']
+            total['rows'] += span['rows'] or 0
+            total['errors'] += span['error'] is not None
+
+    def extend(self, spans):
+        # Spans recorded in another process (e.g. train_all's workers)
+        for span in spans:
+            self.add(span)
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.totals = {}
+
+    def report(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'peak_rss_mb': peak_rss_mb(),
+                'spans': list(self.spans),
+                'totals': {name: dict(total) for name, total in self.totals.items()}
+            }
+
+    def write_report(self, path):
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def prometheus(self, prefix='soilfusion'):
+        # Prometheus text exposition format of the per-stage totals
+        with self._lock:
+            totals = {name: dict(total) for name, total in self.totals.items()}
+        metrics = [
+            ('stage_calls_total', 'counter', 'Calls per pipeline stage or inference function', 'count'),
+            ('stage_errors_total', 'counter', 'Calls that raised', 'errors'),
+            ('stage_wall_seconds_total', 'counter', 'Wall-clock seconds spent in the stage', 'wall_s'),
+            ('stage_cpu_seconds_total', 'counter', 'Process CPU seconds spent in the stage', 'cpu_s'),
+            ('stage_rows_total', 'counter', 'Rows processed by the stage', 'rows'),
+        ]
+        lines = []
+        for metric, kind, help_text, key in metrics:
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            for name, total in sorted(totals.items()):
+                lines.append(f'{prefix}_{metric}{{stage="{name}"}} {total[key]}')
+        lines.append(f"# HELP {prefix}_peak_rss_bytes Peak resident set size of the process")
+        lines.append(f"# TYPE {prefix}_peak_rss_bytes gauge")
+        peak = peak_rss_mb()
+        lines.append(f"{prefix}_peak_rss_bytes {int(peak * 1024 * 1024) if peak is not None else 'NaN'}")
+        return "\n".join(lines) + "\n"
+
+class _Span:
+    __slots__ = ('recorder', 'name', 'rows', 'record', '_wall', '_cpu', '_rss')
+
+    def __init__(self, recorder, name, rows=None):
+        self.recorder = recorder
+        self.name = name
+        self.rows = rows
+        self.record = None
+
+    def __enter__(self):
+        if not self.recorder.active():
+            return self
+        stack = self.recorder._stack()
+        self.record = {'name': self.name, 'parent': stack[-1] if stack else None, 'start': time.time()}
+        stack.append(self.name)
+        self._rss = peak_rss_mb()
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.record is None:
+            return False
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        self.recorder._stack().pop()
+        peak = peak_rss_mb()
+        self.record.update({
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'rows': self.rows,
+            'peak_rss_mb': peak,
+            # How far this span pushed the process high-water mark
+            'peak_rss_growth_mb': peak - self._rss if peak is not None else None,
+            'error': exc_type.__name__ if exc_type else None
+        })
+        self.recorder.add(self.record)
+        return False
+
+class _Collector:
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.spans = []
+
+    def __enter__(self):
+        local = self.recorder._local
+        if not hasattr(local, 'collectors'):
+            local.collectors = []
+        local.collectors.append(self.spans)
+        return self.spans
+
+    def __exit__(self, exc_type, exc, tb):
+        self.recorder._local.collectors.remove(self.spans)
+        return False
+
+recorder = Recorder(enabled=os.environ.get('SOILFUSION_METRICS', '').lower() in ('1', 'true', 'yes'))
+
+def instrumented(name=None, rows=None):
+    # Decorator: wraps the call in a span when recording is active. `rows(result, *args,
+    # **kwargs)` returns the row count to attach. When off, the only cost is one check.
+    def decorate(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not recorder.active():
+                return fn(*args, **kwargs)
+            with recorder.span(span_name) as span:
+                result = fn(*args, **kwargs)
+                if rows is not None and span.record is not None:
+                    try:
+                        span.rows = int(rows(result, *args, **kwargs))
+                    except Exception:
+                        span.rows = None
+                return result
+        return wrapper
+    return decorate
+
+def summarize(spans):
+    # Compact per-call view for API responses
+    return {
+        'total_s': sum(s['wall_s'] for s in spans if s['parent'] is None),
+        'spans': [{k: s[k] for k in ('name', 'parent', 'wall_s', 'cpu_s', 'rows', 'peak_rss_mb', 'error')} for s in spans]
+    }
@@ -0,0 +1,46 @@
+import json
+import os
+
+import pandas as pd
+
+from ml_manifest import MANIFEST_FILE, read_manifest
+from test_incremental import make_pipeline
+
+
+def write_farmer_sheet(pipeline, mtime):
+    path = os.path.join(pipeline.data_dir, 'sensor_readings.csv')
+    pd.DataFrame({
+        'Farmer': ['Asha'] * 4 + ['Ravi'] * 3,
+        'N': [40, 42, 45, 41, 30, 31, 33], 'P': [20] * 7, 'K': [35] * 7,
+        'pH': [6.5] * 7, 'Temp': [24.0] * 7, 'Rain': [120.0] * 7
+    }).to_csv(path, index=False)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_farmer_sheet_dates_end_on_the_sensor_table_mtime(tmp_path):
+    mtime = pd.Timestamp('2024-03-10 15:30').timestamp()
+    pipeline = make_pipeline(tmp_path)
+    write_farmer_sheet(pipeline, mtime)
+    pipeline.load_data()
+
+    dates = pipeline.raw_df.groupby('field_id')['date'].agg(['min', 'max'])
+    assert (dates['max'] == pd.Timestamp('2024-03-10')).all()
+    assert sorted(dates['min']) == [pd.Timestamp('2024-03-07'), pd.Timestamp('2024-03-08')]
+
+    manifest = read_manifest(pipeline.data_dir)
+    assert {entry['last_date'] for entry in manifest['fields']} == {'2024-03-10'}
+
+
+def test_farmer_sheet_reload_keeps_dates_and_manifest(tmp_path):
+    pipeline = make_pipeline(tmp_path)
+    write_farmer_sheet(pipeline, pd.Timestamp('2024-03-10').timestamp())
+    pipeline.load_data()
+    with open(os.path.join(pipeline.data_dir, MANIFEST_FILE), encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    reloaded = make_pipeline(tmp_path)
+    reloaded.load_data()
+    pd.testing.assert_series_equal(reloaded.raw_df['date'], pipeline.raw_df['date'])
+    assert read_manifest(reloaded.data_dir) == manifest
+    assert not reloaded.refresh_field_manifest()
@@ -0,0 +1,86 @@
+import os
+
+import pandas as pd
+import pytest
+
+from ml_pipeline import FIELD_TAIL_ROWS
+from test_incremental import make_pipeline
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    pipeline = make_pipeline(tmp_path)
+    pipeline.generate_synthetic_data(num_fields=4, days=60)
+    pipeline.load_data()
+    pipeline.preprocess_data()
+    return pipeline
+
+
+def field_files(pipeline):
+    return sorted(name for name in os.listdir(pipeline._field_store_dir()) if name.endswith('.parquet'))
+
+
+def daily_rows(pipeline):
+    # What preprocess_data hands the store: the sorted daily rows before feature engineering
+    return pipeline.raw_df.sort_values(by=['field_id', 'date']).reset_index(drop=True)
+
+
+def test_load_field_matches_load_features(tmp_path, pipeline):
+    full = make_pipeline(tmp_path)
+    full.load_features()
+    for field_id in pipeline.processed_df['field_id'].unique():
+        single = make_pipeline(tmp_path)
+        assert single.load_field(field_id)
+        expected = full.processed_df[full.processed_df['field_id'] == field_id].tail(FIELD_TAIL_ROWS)
+        # The feature store and the per-field files keep dates at different units
+        pd.testing.assert_frame_equal(single.processed_df.astype({'date': 'datetime64[ns]'}),
+                                      expected.reset_index(drop=True).astype({'date': 'datetime64[ns]'}),
+                                      check_categorical=False, check_exact=True)
+
+
+def test_load_field_refuses_a_stale_store(tmp_path, pipeline):
+    field_id = int(pipeline.processed_df['field_id'].iloc[0])
+    with open(os.path.join(pipeline.data_dir, 'sensor_readings.csv'), 'a') as f:
+        f.write(f"{field_id},2031-01-01 00:00:00,30,20,6.5,40,0,50\n")
+    assert not make_pipeline(tmp_path).load_field(field_id)
+
+
+def test_save_rewrites_only_changed_fields(pipeline):
+    df = daily_rows(pipeline)
+    assert len(field_files(pipeline)) == 4
+    assert pipeline.save_field_store(df) == 0
+
+    changed = df.copy()
+    first = changed['field_id'] == changed['field_id'].iloc[0]
+    changed.loc[first & (changed['date'] == changed['date'].max()), 'moisture'] += 1
+    assert pipeline.save_field_store(changed) == 1
+    assert pipeline.save_field_store(changed) == 0
+
+    last_field = changed['field_id'].iloc[-1]
+    assert pipeline.save_field_store(changed[changed['field_id'] != last_field]) == 0
+    assert f"{last_field}.parquet" not in field_files(pipeline)
+    assert len(field_files(pipeline)) == 3
+
+
+def test_partial_save_updates_only_the_given_fields(pipeline):
+    df = daily_rows(pipeline)
+    first, second = df['field_id'].unique()[:2]
+    changed = df.copy()
+    changed.loc[changed['field_id'].isin([first, second]), 'nitrogen'] += 1
+
+    assert pipeline.save_field_store(changed, field_ids=[first]) == 1
+    # The other fields' files and digests are untouched: a full save still finds `second` changed
+    assert len(field_files(pipeline)) == 4
+    assert pipeline.save_field_store(changed) == 1
+    stored = pd.read_parquet(os.path.join(pipeline._field_store_dir(), f"{second}.parquet"))
+    pd.testing.assert_series_equal(stored['nitrogen'], changed.loc[changed['field_id'] == second, 'nitrogen'].reset_index(drop=True),
+                                   check_dtype=False)
+
+
+def test_schema_change_rebuilds_the_store(pipeline):
+    df = daily_rows(pipeline)
+    assert pipeline.save_field_store(df.assign(extra=1.0)) == 4
+    assert 'extra' in pd.read_parquet(os.path.join(pipeline._field_store_dir(), field_files(pipeline)[0])).columns
+    # A partial save can't patch a store written with other columns
+    assert pipeline.save_field_store(df, field_ids=[df['field_id'].iloc[0]]) == 0
+    assert not [name for name in os.listdir(os.path.dirname(pipeline._field_store_dir())) if '.tmp-' in name or '.old-' in name]
@@ -0,0 +1,79 @@
+import os
+
+import pandas as pd
+import pytest
+
+from ml_pipeline import SoilFusionMLPipeline, INCOMING_DIR
+
+
+def make_pipeline(tmp_path, **kwargs):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir(exist_ok=True)
+    return SoilFusionMLPipeline(data_dir=str(data_dir), model_dir=str(tmp_path / 'models'),
+                                plots_dir=str(tmp_path / 'plots'), plots='off', **kwargs)
+
+
+def write_incoming(pipeline, name, rows):
+    directory = os.path.join(pipeline.data_dir, INCOMING_DIR)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return path
+
+
+def test_full_run_sets_incoming_files_aside_for_legacy_sensor_table(tmp_path):
+    pipeline = make_pipeline(tmp_path)
+    pipeline.generate_synthetic_data(num_fields=3, days=20, output_format='legacy')
+    path = write_incoming(pipeline, 'new.csv', {'field_id': [100001], 'timestamp': ['2030-01-01'], 'moisture_percent': [25.0]})
+
+    assert pipeline.append_readings() == 0
+    assert not os.path.exists(path)
+    assert os.path.exists(os.path.join(os.path.dirname(path), 'applied', 'rejected-new.csv'))
+    # The rest of the full run goes ahead on the sensor table as it is
+    pipeline.load_data()
+    pipeline.preprocess_data()
+    assert pipeline.processed_df['field_id'].nunique() == 3
+
+
+def test_incremental_run_rejects_legacy_sensor_table(tmp_path):
+    pipeline = make_pipeline(tmp_path)
+    pipeline.generate_synthetic_data(num_fields=3, days=20, output_format='legacy')
+    pipeline.load_data()
+    pipeline.preprocess_data()
+    path = write_incoming(pipeline, 'new.csv', {'field_id': [100001], 'timestamp': ['2030-01-01'], 'moisture_percent': [25.0]})
+
+    with pytest.raises(ValueError, match='wide sensor_readings format'):
+        pipeline.append_readings()
+    assert os.path.exists(path)
+
+
+def test_appended_readings_splice_equals_full_recompute(tmp_path):
+    pipeline = make_pipeline(tmp_path)
+    pipeline.generate_synthetic_data(num_fields=4, days=40, readings_per_day=2)
+    pipeline.load_data()
+    pipeline.preprocess_data()
+    readings = pd.read_csv(os.path.join(pipeline.data_dir, 'sensor_readings.csv'))
+    last = pd.to_datetime(readings['timestamp']).max().normalize()
+    # Two new days for one field, a third reading on its last existing day for another
+    # (which changes that day's mean), and nothing for the rest
+    first, second = readings['field_id'].unique()[:2]
+    new = pd.DataFrame({
+        'field_id': [first, first, second],
+        'timestamp': [f"{last + pd.Timedelta(days=d, hours=9):%Y-%m-%d %H:%M:%S}" for d in (1, 2)] + [f"{last:%Y-%m-%d} 23:00:00"],
+        'moisture_percent': [31.0, 33.5, 12.0], 'temperature_c': [25.0, 26.0, 30.0], 'ph': [6.4, 6.5, 7.9],
+        'nitrogen_ppm': [41.0, 39.0, 20.0], 'rainfall_mm': [0.0, 12.0, 0.0], 'humidity_percent': [55.0, 60.0, 40.0]
+    })
+    write_incoming(pipeline, 'new.csv', new)
+
+    assert pipeline.append_readings() == 3
+    # Affected fields are recomputed from the earliest new day on, not the rest of the table
+    recomputed = set(zip(pipeline.new_rows['field_id'], pipeline.new_rows['date']))
+    assert recomputed == {(first, last), (first, last + pd.Timedelta(days=1)), (first, last + pd.Timedelta(days=2)), (second, last)}
+
+    fresh = make_pipeline(tmp_path)
+    fresh.load_data()
+    fresh.preprocess_data()
+    pd.testing.assert_frame_equal(pipeline.processed_df, fresh.processed_df, check_categorical=False, check_exact=True)
+    # The stores were patched to the same state the full run writes
+    assert make_pipeline(tmp_path).load_feature_store()
+    assert fresh.save_field_store(fresh.raw_df.sort_values(by=['field_id', 'date']).reset_index(drop=True)) == 0
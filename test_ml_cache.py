@@ -0,0 +1,122 @@
+import importlib.util
+import os
+
+import pytest
+
+import ml_cache
+from ml_cache import ResultCache, directory_signature
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ml_cache.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def inference(tmp_path, monkeypatch):
+    # Backend/inference.py with its directories and cache under tmp_path, and analyze_field
+    # counting calls instead of running models
+    spec = importlib.util.spec_from_file_location('inference_under_test', os.path.join(ROOT, 'Backend', 'inference.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    for name in ['data', 'models']:
+        (tmp_path / name).mkdir()
+    monkeypatch.setattr(module, 'DATA_DIR', str(tmp_path / 'data'))
+    monkeypatch.setattr(module, 'MODEL_DIR', str(tmp_path / 'models'))
+    monkeypatch.setattr(module, 'result_cache', ResultCache(str(tmp_path / 'cache.sqlite')))
+    module.calls = []
+
+    def analyze_field(pipeline, field_id, lang):
+        module.calls.append(field_id)
+        return {'field_id': field_id}
+
+    monkeypatch.setattr(module, 'analyze_field', analyze_field)
+    return module
+
+
+def test_get_returns_what_put_stored(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.sqlite'))
+    assert cache.get('a') is None
+    cache.put('a', {'yield': 1.5}, 'v1')
+    assert cache.get('a') == {'yield': 1.5}
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_new_version_purges_old_entries(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.sqlite'))
+    cache.put('a:v1', 1, 'v1')
+    cache.put('b:v1', 2, 'v1')
+    cache.put('a:v2', 3, 'v2')
+    assert cache.get('b:v1') is None
+    assert cache.stats()['invalidations'] == 2
+    assert cache.stats()['entries'] == 1
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = ResultCache(str(tmp_path / 'cache.sqlite'), ttl=10)
+    cache.put('a', 1, 'v1')
+    assert cache.get('a') == 1
+    clock.now += 10
+    assert cache.get('a') is None
+    assert cache.stats()['expired'] == 1
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, clock):
+    cache = ResultCache(str(tmp_path / 'cache.sqlite'), max_entries=2)
+    cache.put('a', 1, 'v1')
+    cache.put('b', 2, 'v1')
+    cache.get('a')
+    cache.put('c', 3, 'v1')
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_directory_signature_changes_with_files(tmp_path):
+    (tmp_path / 'model.onnx').write_bytes(b'1')
+    before = directory_signature(str(tmp_path))
+    assert directory_signature(str(tmp_path)) == before
+    (tmp_path / 'model.onnx').write_bytes(b'22')
+    assert directory_signature(str(tmp_path)) != before
+    assert directory_signature(str(tmp_path), lambda name: name.endswith('.json')) == ()
+    assert directory_signature(str(tmp_path / 'missing')) == ()
+
+
+def test_cached_analysis_misses_after_model_or_data_change(tmp_path, inference):
+    (tmp_path / 'models' / 'yield_model.onnx').write_bytes(b'model')
+    (tmp_path / 'data' / 'sensor_readings.csv').write_text('field_id\n1\n')
+    load = lambda: None
+
+    assert inference.cached_analysis(load, 1) == {'field_id': 1}
+    assert inference.cached_analysis(load, 1) == {'field_id': 1}
+    assert inference.calls == [1]
+
+    # A retrain publishes new model files
+    (tmp_path / 'models' / 'yield_model.onnx').write_bytes(b'retrained')
+    inference.cached_analysis(load, 1)
+    assert inference.calls == [1, 1]
+
+    # An upload changes the data directory
+    (tmp_path / 'data' / 'sensor_readings.csv').write_text('field_id\n1\n2\n')
+    inference.cached_analysis(load, 1)
+    inference.cached_analysis(load, 1)
+    assert inference.calls == [1, 1, 1]
+
+    # Files the version ignores: the field manifest and non-model files
+    (tmp_path / 'data' / inference.MANIFEST_FILE).write_text('{}')
+    (tmp_path / 'models' / 'notes.txt').write_text('x')
+    inference.cached_analysis(load, 1)
+    assert inference.calls == [1, 1, 1]
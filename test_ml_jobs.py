@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+
+import pytest
+
+from ml_jobs import TrainingJobs
+
+# Stands in for ml_pipeline.py: records its arguments, then waits for a release file
+FAKE_PIPELINE = """import os, sys, time
+root = os.path.dirname(os.path.abspath(__file__))
+with open(os.path.join(root, 'runs.log'), 'a') as f:
+    f.write(' '.join(sys.argv[1:]) + '\\n')
+print('{"progress": {"step": "load_data"}}', flush=True)
+while not os.path.exists(os.path.join(root, 'release')):
+    time.sleep(0.02)
+sys.exit(int(open(os.path.join(root, 'release')).read() or 0))
+"""
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    (tmp_path / 'ml_pipeline.py').write_text(FAKE_PIPELINE)
+    jobs = TrainingJobs(str(tmp_path), python=sys.executable)
+    yield jobs
+    (tmp_path / 'release').write_text('0')
+    if jobs._process is not None:
+        jobs._process.wait(timeout=10)
+
+
+def wait_for(jobs, job_id, states=TrainingJobs.FINISHED, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = jobs.status(job_id)
+        if job['state'] in states:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} still {jobs.status(job_id)['state']}")
+
+
+def runs(tmp_path):
+    path = tmp_path / 'runs.log'
+    return path.read_text().splitlines() if path.exists() else []
+
+
+def test_rejects_unknown_mode(jobs):
+    with pytest.raises(ValueError):
+        jobs.submit('partial')
+
+
+def test_requests_during_a_run_share_one_queued_run_upgraded_to_full(tmp_path, jobs):
+    running = jobs.submit('incremental')
+    assert running['state'] == 'running'
+    queued = jobs.submit('incremental')
+    assert queued['state'] == 'queued' and queued['mode'] == 'incremental'
+
+    joined = jobs.submit('full')
+    assert joined['id'] == queued['id'] and joined['mode'] == 'full' and joined['requests'] == 2
+    joined = jobs.submit('incremental')
+    assert joined['id'] == queued['id'] and joined['mode'] == 'full' and joined['requests'] == 3
+    assert jobs.list()['running'] == running['id'] and jobs.list()['queued'] == queued['id']
+
+    (tmp_path / 'release').write_text('0')
+    assert wait_for(jobs, running['id'])['state'] == 'succeeded'
+    assert wait_for(jobs, queued['id'])['state'] == 'succeeded'
+    first, second = runs(tmp_path)
+    assert first.endswith('--incremental')
+    assert '--incremental' not in second and queued['id'] in second
+    assert jobs.list()['running'] is None and jobs.list()['queued'] is None
+
+
+def test_cancelled_queued_run_never_starts(tmp_path, jobs):
+    running = jobs.submit()
+    queued = jobs.submit()
+    assert jobs.cancel(queued['id'])['state'] == 'cancelled'
+    assert jobs.list()['queued'] is None
+    # A request after the cancel queues a new run rather than joining the cancelled one
+    again = jobs.submit()
+    assert again['id'] != queued['id'] and again['requests'] == 1
+
+    (tmp_path / 'release').write_text('0')
+    wait_for(jobs, running['id'])
+    wait_for(jobs, again['id'])
+    assert len(runs(tmp_path)) == 2
+    assert jobs.status(queued['id'])['state'] == 'cancelled'
+
+
+def test_cancel_terminates_the_running_process(tmp_path, jobs):
+    running = jobs.submit()
+    wait_for(jobs, running['id'], states=('running',))
+    while not runs(tmp_path):
+        time.sleep(0.02)
+    jobs.cancel(running['id'])
+    job = wait_for(jobs, running['id'])
+    assert job['state'] == 'cancelled'
+    assert jobs.cancel(running['id'])['state'] == 'cancelled'
+
+
+def test_failed_run_reports_exit_code_and_starts_queued_run(tmp_path, jobs):
+    running = jobs.submit()
+    while not runs(tmp_path):
+        time.sleep(0.02)
+    queued = jobs.submit()
+    (tmp_path / 'release').write_text('3')
+    job = wait_for(jobs, running['id'])
+    assert job['state'] == 'failed' and job['error'] == 'ml_pipeline.py exited with code 3'
+    assert job['progress'] == {'step': 'load_data'}
+    assert wait_for(jobs, queued['id'])['state'] == 'failed'